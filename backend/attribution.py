@@ -0,0 +1,162 @@
+"""
+Model attribution probe.
+
+A linear classifier (logistic regression trained by SGD) that predicts which
+model generated a response from its prompt-centered embedding or stylometric
+fingerprint. SGD lets the probe be updated with partial_fit as new responses
+arrive instead of being refit from scratch.
+"""
+
+import pickle
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+
+import storage
+from settings import MODELS, ATTRIBUTION_CV_FOLDS, ATTRIBUTION_FIT_EPOCHS
+
+# Fixed label set so partial_fit can accept models that have no responses yet
+LABELS = list(MODELS.keys())
+
+
+def new_classifier():
+    from sklearn.linear_model import SGDClassifier
+
+    return SGDClassifier(loss="log_loss", alpha=1e-4, random_state=42)
+
+
+def train_classifier(X: np.ndarray, y: np.ndarray, classifier=None, epochs: int = ATTRIBUTION_FIT_EPOCHS):
+    """Fit (or continue fitting) a classifier with shuffled partial_fit passes."""
+    if classifier is None:
+        classifier = new_classifier()
+
+    rng = np.random.default_rng(42)
+    for _ in range(epochs):
+        order = rng.permutation(len(y))
+        classifier.partial_fit(X[order], y[order], classes=LABELS)
+    return classifier
+
+
+def _score_fold(X: np.ndarray, y: np.ndarray, train_idx: np.ndarray, test_idx: np.ndarray):
+    classifier = train_classifier(X[train_idx], y[train_idx])
+    return test_idx, classifier.predict(X[test_idx])
+
+
+def cross_validate(X: np.ndarray, y: np.ndarray, groups: np.ndarray, n_splits: int = ATTRIBUTION_CV_FOLDS) -> Dict:
+    """
+    Prompt-grouped cross-validation, with folds fitted in parallel across cores.
+
+    All responses to a prompt land in the same fold, so the probe is scored on
+    prompts it has never seen.
+
+    Returns:
+        accuracy, per-fold accuracies and a confusion matrix over LABELS
+        (rows are true models, columns are predicted models)
+    """
+    from joblib import Parallel, delayed
+    from sklearn.metrics import confusion_matrix
+    from sklearn.model_selection import GroupKFold
+
+    n_splits = min(n_splits, len(set(groups.tolist())))
+    if n_splits < 2:
+        raise ValueError("Need responses to at least 2 prompts to cross-validate")
+
+    folds = Parallel(n_jobs=-1)(
+        delayed(_score_fold)(X, y, train_idx, test_idx)
+        for train_idx, test_idx in GroupKFold(n_splits=n_splits).split(X, y, groups)
+    )
+
+    predicted = np.empty(len(y), dtype=object)
+    fold_accuracies = []
+    for test_idx, fold_predicted in folds:
+        predicted[test_idx] = fold_predicted
+        fold_accuracies.append(float(np.mean(fold_predicted == y[test_idx])))
+
+    return {
+        "accuracy": float(np.mean(predicted == y)),
+        "fold_accuracies": fold_accuracies,
+        "n_splits": n_splits,
+        "labels": LABELS,
+        "confusion_matrix": confusion_matrix(y, predicted, labels=LABELS).tolist(),
+    }
+
+
+def new_state(embedding_model: str, features: str = "embedding") -> Dict:
+    """
+    Everything needed to predict and to keep training incrementally.
+
+    Running sums per prompt let new responses be centered against the same
+    prompt means the probe was trained with.
+    """
+    return {
+        "embedding_model": embedding_model,
+        "features": features,
+        "classifier": None,
+        "trained_hashes": set(),
+        "prompt_sums": {},
+        "prompt_counts": defaultdict(int),
+        "global_sum": None,
+        "global_count": 0,
+        "cv": None,
+    }
+
+
+def _accumulate(state: Dict, embeddings: np.ndarray, prompt_ids: List):
+    for embedding, prompt_id in zip(embeddings, prompt_ids):
+        if prompt_id in state["prompt_sums"]:
+            state["prompt_sums"][prompt_id] = state["prompt_sums"][prompt_id] + embedding
+        else:
+            state["prompt_sums"][prompt_id] = embedding.copy()
+        state["prompt_counts"][prompt_id] += 1
+
+    batch_sum = embeddings.sum(axis=0)
+    state["global_sum"] = batch_sum if state["global_sum"] is None else state["global_sum"] + batch_sum
+    state["global_count"] += len(embeddings)
+
+
+def center(state: Dict, embeddings: np.ndarray, prompt_ids: List) -> np.ndarray:
+    """Subtract each prompt's mean, falling back to the corpus mean for unseen prompts."""
+    centered = embeddings.copy()
+    global_mean = state["global_sum"] / state["global_count"]
+    for i, prompt_id in enumerate(prompt_ids):
+        if prompt_id in state["prompt_sums"]:
+            centered[i] -= state["prompt_sums"][prompt_id] / state["prompt_counts"][prompt_id]
+        else:
+            centered[i] -= global_mean
+    return centered
+
+
+def fit_state(state: Dict, embeddings: np.ndarray, prompt_ids: List, labels: List[str], hashes: List[str]):
+    """Train from scratch on the full corpus."""
+    _accumulate(state, embeddings, prompt_ids)
+    X = center(state, embeddings, prompt_ids)
+    state["classifier"] = train_classifier(X, np.array(labels, dtype=object))
+    state["trained_hashes"].update(hashes)
+
+
+def update_state(state: Dict, embeddings: np.ndarray, prompt_ids: List, labels: List[str], hashes: List[str]):
+    """Fold newly arrived responses into the prompt means and the classifier."""
+    _accumulate(state, embeddings, prompt_ids)
+    X = center(state, embeddings, prompt_ids)
+    train_classifier(X, np.array(labels, dtype=object), classifier=state["classifier"], epochs=1)
+    state["trained_hashes"].update(hashes)
+
+
+def predict(state: Dict, embedding: np.ndarray, prompt_id: Optional[int] = None) -> Dict[str, float]:
+    """Probability of each model having generated the embedded response."""
+    X = center(state, embedding[np.newaxis, :], [prompt_id])
+    probabilities = state["classifier"].predict_proba(X)[0]
+    return {str(label): float(p) for label, p in zip(state["classifier"].classes_, probabilities)}
+
+
+def load_state(path: Path) -> Optional[Dict]:
+    if path.exists():
+        with open(path, "rb") as f:
+            return pickle.load(f)
+    return None
+
+
+def save_state(state: Dict, path: Path):
+    storage.atomic_write_bytes(path, pickle.dumps(state))
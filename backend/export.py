@@ -0,0 +1,136 @@
+"""
+Columnar snapshots of responses and embeddings for analysis.
+
+Responses (with prompt category, provider and telemetry) and per-model
+embedding vectors are written as Parquet or Arrow IPC files. Arrow IPC files
+can be memory-mapped and read without copying; embeddings are stored as a
+fixed-size float32 list column, so they become an (n, dim) numpy array with:
+
+    import pyarrow as pa
+    table = pa.ipc.open_file(pa.memory_map("embeddings__all-mpnet-base-v2.arrow")).read_all()
+    vectors = table["embedding"].combine_chunks().values.to_numpy().reshape(len(table), -1)
+
+Each snapshot records the signature of the data it was built from and is only
+rebuilt when that data has changed.
+"""
+
+import json
+import os
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+import storage
+
+FORMATS = {"parquet": ".parquet", "arrow": ".arrow"}
+MANIFEST_FILE = "manifest.json"
+
+
+def responses_table(responses: List[Dict], prompt_category: Callable, provider: Callable, response_hash: Callable):
+    import pyarrow as pa
+
+    def column(field, dtype):
+        return pa.array([r.get(field) for r in responses], type=dtype)
+
+    return pa.table({
+        "prompt_id": column("prompt_id", pa.int64()),
+        "category": pa.array([prompt_category(r.get("prompt_id")) for r in responses], type=pa.string()),
+        "model": column("model", pa.string()),
+        "provider": pa.array([provider(r["model"]) for r in responses], type=pa.string()),
+        "prompt": column("prompt", pa.string()),
+        "response": column("response", pa.string()),
+        "response_hash": pa.array([response_hash(r["response"]) for r in responses], type=pa.string()),
+        "ttft_ms": column("ttft_ms", pa.float64()),
+        "latency_ms": column("latency_ms", pa.float64()),
+        "prompt_tokens": column("prompt_tokens", pa.int64()),
+        "completion_tokens": column("completion_tokens", pa.int64()),
+    })
+
+
+def embeddings_table(store: Dict):
+    """One row per stored vector, keyed by response_hash; the memmap is handed to Arrow without copying."""
+    import pyarrow as pa
+
+    hashes = [None] * store["rows"]
+    for text_hash, row in store["index"].items():
+        hashes[row] = text_hash
+
+    vectors = np.asarray(store["vectors"]).reshape(-1)
+    return pa.table({
+        "response_hash": pa.array(hashes, type=pa.string()),
+        "embedding": pa.FixedSizeListArray.from_arrays(pa.array(vectors, type=pa.float32()), store["dim"]),
+    })
+
+
+def write_table(table, path: Path, fmt: str):
+    """Write a table to a temporary file and move it into place atomically."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    if fmt == "parquet":
+        pq.write_table(table, tmp_path)
+    else:
+        with pa.OSFile(str(tmp_path), "wb") as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+    os.replace(tmp_path, path)
+
+
+def refresh_snapshot(directory: Path, name: str, fmt: str, source_signature, build_table: Callable) -> Dict:
+    """
+    Rebuild a snapshot only if its source changed since it was last written.
+
+    Returns:
+        {"path", "rows", "rebuilt"}
+    """
+    path = directory / f"{name}{FORMATS[fmt]}"
+    manifest_path = directory / MANIFEST_FILE
+    # Compare in JSON form, since that is how the manifest stores it
+    signature = json.loads(json.dumps(source_signature))
+
+    with storage.locked(manifest_path):
+        manifest = storage.read_json(manifest_path, default={})
+        entry = manifest.get(path.name)
+        if entry and entry["source_signature"] == signature and path.exists():
+            return {"path": str(path), "rows": entry["rows"], "rebuilt": False}
+
+        table = build_table()
+        write_table(table, path, fmt)
+        storage.atomic_write_json(
+            manifest_path,
+            {**manifest, path.name: {"source_signature": signature, "rows": table.num_rows}}
+        )
+        return {"path": str(path), "rows": table.num_rows, "rebuilt": True}
+
+
+def remove_snapshots(directory: Path, name: str) -> List[str]:
+    """Delete a snapshot in every format, with its manifest entries. Returns the removed file names."""
+    manifest_path = directory / MANIFEST_FILE
+    filenames = [f"{name}{suffix}" for suffix in FORMATS.values()]
+
+    with storage.locked(manifest_path):
+        removed = []
+        for filename in filenames:
+            try:
+                (directory / filename).unlink()
+                removed.append(filename)
+            except FileNotFoundError:
+                pass
+
+        manifest = storage.read_json(manifest_path, default={})
+        if any(filename in manifest for filename in filenames):
+            storage.atomic_write_json(
+                manifest_path,
+                {key: entry for key, entry in manifest.items() if key not in filenames}
+            )
+        return removed
+
+
+def embeddings_snapshot_name(embedding_model: str) -> str:
+    return "embeddings__" + embedding_model.replace("/", "__")
+
+
+def store_signature(store: Optional[Dict]):
+    return (store["inode"], store["rows"]) if store else None
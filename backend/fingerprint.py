@@ -0,0 +1,226 @@
+"""
+Transformer-free stylometric fingerprints.
+
+Lexical and stylistic features that need no model, only CPU (roughly hundreds
+of texts per second per core, parallelised across cores for large batches):
+
+- hashed word n-grams and byte 3-/4-grams in a sparse matrix
+- response length, markdown structure (headings, lists, code fences, bold),
+  punctuation and emoji rates
+
+The sparse n-gram matrix is compressed with a fixed-seed sparse random
+projection. The projection is linear and stateless, so prompt centering,
+cosine similarity and UMAP behave on fingerprints as they do on embeddings,
+and a text always maps to the same vector no matter what corpus it is in.
+Style features are standardised with fixed constants for the same reason, and
+scaled so the style block has roughly unit norm, like the n-gram projection,
+instead of being dominated by raw length.
+"""
+
+import re
+from typing import List
+
+import numpy as np
+
+from settings import FINGERPRINT_DIMS
+
+# Bump whenever the features change, so stored fingerprints are recomputed
+FINGERPRINT_VERSION = 1
+NGRAM_FEATURES = 2 ** 18
+BYTE_NGRAM_SIZES = (3, 4)
+STYLE_WEIGHT = 0.5
+PARALLEL_CHUNK_SIZE = 5000
+
+HEADING_RE = re.compile(r"^\s{0,3}#{1,6}\s", re.MULTILINE)
+LIST_ITEM_RE = re.compile(r"^\s*(?:[-*+]|\d+[.)])\s", re.MULTILINE)
+CODE_FENCE_RE = re.compile(r"^\s*(?:```|~~~)", re.MULTILINE)
+BOLD_RE = re.compile(r"\*\*[^*\n]+\*\*|__[^_\n]+__")
+INLINE_CODE_RE = re.compile(r"`[^`\n]+`")
+TABLE_ROW_RE = re.compile(r"^\s*\|.*\|\s*$", re.MULTILINE)
+WORD_RE = re.compile(r"\w+")
+UPPERCASE_RE = re.compile(r"[A-Z]")
+EMOJI_RE = re.compile(
+    "[\U0001F300-\U0001FAFF\U00002600-\U000027BF\U0001F1E6-\U0001F1FF\U00002B00-\U00002BFF]"
+)
+PUNCTUATION = [".", ",", "!", "?", ":", ";", "(", '"', "'", "—", "–", "…"]
+
+# (typical value, spread) of each style feature in chat-model answers, used to
+# standardise them. Fixed rather than fitted, so fingerprints stay corpus-independent.
+STYLE_STATS = {
+    "log_chars": (7.0, 1.0),
+    "log_words": (5.5, 1.0),
+    "log_lines": (3.0, 1.0),
+    "mean_word_length": (4.8, 0.6),
+    "uppercase_rate": (0.03, 0.02),
+    "newline_rate": (2.0, 1.5),
+    "heading_rate": (0.05, 0.08),
+    "list_item_rate": (0.3, 0.25),
+    "code_fence_rate": (0.02, 0.05),
+    "bold_rate": (0.2, 0.3),
+    "inline_code_rate": (0.1, 0.3),
+    "table_row_rate": (0.02, 0.1),
+    "emoji_rate": (0.02, 0.1),
+}
+PUNCTUATION_STATS = {
+    ".": (1.0, 0.5), ",": (0.8, 0.5), "!": (0.05, 0.1), "?": (0.1, 0.15),
+    ":": (0.4, 0.4), ";": (0.05, 0.1), "(": (0.2, 0.2), '"': (0.2, 0.3),
+    "'": (0.3, 0.3), "—": (0.1, 0.15), "–": (0.02, 0.05), "…": (0.01, 0.05),
+}
+STYLE_STATS.update({f"punct_{p}_rate": PUNCTUATION_STATS[p] for p in PUNCTUATION})
+# Standardised values are clipped so a single unusual feature cannot swamp the block
+STYLE_CLIP = 3.0
+
+STYLE_FEATURES = list(STYLE_STATS)
+STYLE_CENTERS = np.array([STYLE_STATS[f][0] for f in STYLE_FEATURES], dtype=np.float32)
+STYLE_SCALES = np.array([STYLE_STATS[f][1] for f in STYLE_FEATURES], dtype=np.float32)
+
+_word_vectorizer = None
+_projector = None
+
+
+def get_word_vectorizer():
+    """Stateless hashing vectorizer for word unigrams and bigrams."""
+    global _word_vectorizer
+    if _word_vectorizer is None:
+        from sklearn.feature_extraction.text import HashingVectorizer
+
+        _word_vectorizer = HashingVectorizer(
+            analyzer="word", ngram_range=(1, 2), n_features=NGRAM_FEATURES,
+            alternate_sign=False, norm="l2", dtype=np.float32,
+        )
+    return _word_vectorizer
+
+
+def byte_ngram_matrix(texts: List[str]):
+    """
+    Sparse (n_texts, NGRAM_FEATURES) matrix of hashed UTF-8 byte n-gram counts, L2-normalised.
+
+    All texts are packed into one byte buffer so n-grams are extracted and
+    hashed with numpy in a handful of passes instead of per character in Python.
+    """
+    from scipy import sparse
+    from sklearn.preprocessing import normalize
+
+    encoded = [t.encode("utf-8") for t in texts]
+    lengths = np.array([len(b) for b in encoded], dtype=np.int64)
+    buffer = np.frombuffer(b"".join(encoded), dtype=np.uint8).astype(np.uint64)
+    doc_ids = np.repeat(np.arange(len(texts)), lengths)
+
+    rows, columns = [], []
+    for n in BYTE_NGRAM_SIZES:
+        if len(buffer) < n:
+            continue
+        codes = np.zeros(len(buffer) - n + 1, dtype=np.uint64)
+        for offset in range(n):
+            codes = (codes << np.uint64(8)) | buffer[offset:len(buffer) - n + 1 + offset]
+        # Tag the code with n so a trigram and a 4-gram never share a code, then mix
+        codes = (codes | np.uint64(n << 40)) * np.uint64(0x9E3779B97F4A7C15)
+        starts = doc_ids[:len(codes)]
+        # Drop n-grams that straddle two texts
+        valid = starts == doc_ids[n - 1:]
+        rows.append(starts[valid])
+        columns.append((codes[valid] >> np.uint64(40)) & np.uint64(NGRAM_FEATURES - 1))
+
+    counts = sparse.csr_matrix(
+        (
+            np.ones(sum(len(r) for r in rows), dtype=np.float32),
+            (np.concatenate(rows) if rows else np.zeros(0, dtype=np.int64),
+             np.concatenate(columns).astype(np.int64) if columns else np.zeros(0, dtype=np.int64)),
+        ),
+        shape=(len(texts), NGRAM_FEATURES),
+    )
+    counts.sum_duplicates()
+    return normalize(counts)
+
+
+def get_projector():
+    """Fixed-seed projection from the hashed n-gram space down to FINGERPRINT_DIMS."""
+    global _projector
+    if _projector is None:
+        from scipy import sparse
+        from sklearn.random_projection import SparseRandomProjection
+
+        _projector = SparseRandomProjection(n_components=FINGERPRINT_DIMS, random_state=42)
+        # Fitting only uses the input width to draw the random matrix
+        _projector.fit(sparse.csr_matrix((1, 2 * NGRAM_FEATURES), dtype=np.float32))
+    return _projector
+
+
+def ngram_matrix(texts: List[str]):
+    """Sparse (n_texts, 2 * NGRAM_FEATURES) matrix of hashed word and byte n-grams."""
+    from scipy import sparse
+
+    return sparse.hstack(
+        [get_word_vectorizer().transform(texts), byte_ngram_matrix(texts)],
+        format="csr",
+    )
+
+
+def style_matrix(texts: List[str]) -> np.ndarray:
+    """Dense (n_texts, len(STYLE_FEATURES)) matrix of length, markdown and punctuation features."""
+    chars = np.array([len(t) for t in texts], dtype=np.float32)
+    per_char = np.maximum(chars, 1.0)
+    lines = np.array([t.count("\n") + 1 for t in texts], dtype=np.float32)
+    words = [WORD_RE.findall(t) for t in texts]
+    word_counts = np.array([len(w) for w in words], dtype=np.float32)
+    word_chars = np.array([sum(len(x) for x in w) for w in words], dtype=np.float32)
+
+    def rate(pattern):
+        return np.array([len(pattern.findall(t)) for t in texts], dtype=np.float32)
+
+    columns = [
+        np.log1p(chars),
+        np.log1p(word_counts),
+        np.log1p(lines),
+        word_chars / np.maximum(word_counts, 1.0),
+        rate(UPPERCASE_RE) / per_char,
+        (lines - 1) / per_char * 100,
+        rate(HEADING_RE) / lines,
+        rate(LIST_ITEM_RE) / lines,
+        rate(CODE_FENCE_RE) / lines,
+        rate(BOLD_RE) / per_char * 100,
+        rate(INLINE_CODE_RE) / per_char * 100,
+        rate(TABLE_ROW_RE) / lines,
+        rate(EMOJI_RE) / per_char * 100,
+    ]
+    columns += [
+        np.array([t.count(p) for t in texts], dtype=np.float32) / per_char * 100
+        for p in PUNCTUATION
+    ]
+
+    return np.column_stack(columns)
+
+
+def standardize_style(style: np.ndarray) -> np.ndarray:
+    """
+    Standardise style features with the fixed STYLE_STATS and scale them so a
+    typical row has norm about 1, comparable to the n-gram projection.
+    """
+    standardized = np.clip((style - STYLE_CENTERS) / STYLE_SCALES, -STYLE_CLIP, STYLE_CLIP)
+    return standardized / np.sqrt(len(STYLE_FEATURES))
+
+
+def _fingerprint_chunk(texts: List[str]) -> np.ndarray:
+    projected = get_projector().transform(ngram_matrix(texts))
+    if hasattr(projected, "toarray"):
+        projected = projected.toarray()
+    return np.hstack([projected, STYLE_WEIGHT * standardize_style(style_matrix(texts))]).astype(np.float32)
+
+
+def fingerprint_texts(texts: List[str]) -> np.ndarray:
+    """
+    Dense (n_texts, FINGERPRINT_DIMS + len(STYLE_FEATURES)) fingerprints.
+    Large corpora are split into chunks and fingerprinted in parallel across cores.
+    """
+    if not texts:
+        return np.empty((0, FINGERPRINT_DIMS + len(STYLE_FEATURES)), dtype=np.float32)
+    if len(texts) <= PARALLEL_CHUNK_SIZE:
+        return _fingerprint_chunk(texts)
+
+    from joblib import Parallel, delayed
+
+    chunks = Parallel(n_jobs=-1)(
+        delayed(_fingerprint_chunk)(texts[i:i + PARALLEL_CHUNK_SIZE])
+        for i in range(0, len(texts), PARALLEL_CHUNK_SIZE)
+    )
+    return np.vstack(chunks)
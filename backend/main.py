@@ -1,6 +1,7 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request, Query, BackgroundTasks
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
+from fastapi.responses import StreamingResponse, FileResponse
+from pydantic import BaseModel, Field
 import httpx
 import os
 from dotenv import load_dotenv
@@ -8,9 +9,23 @@ import json
 from pathlib import Path
 from typing import List, Optional, Dict
 import numpy as np
-from collections import defaultdict
-from settings import MODELS, EMBEDDING_MODEL
+from collections import defaultdict, OrderedDict, Counter
+from itertools import combinations
+from settings import (
+    MODELS, EMBEDDING_MODEL, EMBEDDING_MODELS, MAX_RESIDENT_EMBEDDERS, ATTRIBUTION_CV_FOLDS, FEATURE_SETS, STREAM_UPSTREAM,
+    JOB_HEARTBEAT_SECONDS, JOB_STALE_SECONDS,
+    MINHASH_PERMUTATIONS, SHINGLE_SIZE, NEAR_DUPLICATE_THRESHOLD, FINGERPRINT_DIMS,
+)
 import hashlib
+import time
+import uuid
+import asyncio
+import threading
+import attribution
+import fingerprint
+import storage
+import export
+import near_duplicates
 
 load_dotenv()
 
@@ -25,15 +40,31 @@ app.add_middleware(
 )
 
 OPENROUTER_API_KEY = os.getenv("OPENROUTER_API_KEY")
+OPENROUTER_URL = "https://openrouter.ai/api/v1/chat/completions"
 DATA_DIR = Path("data")
 DATA_DIR.mkdir(exist_ok=True)
 PROMPTS_FILE = Path("prompts.json")
 RESPONSES_FILE = DATA_DIR / "responses.json"
 EMBEDDINGS_CACHE_FILE = DATA_DIR / "embeddings_cache.json"
+EMBEDDINGS_DIR = DATA_DIR / "embeddings"
+EMBEDDINGS_DIR.mkdir(exist_ok=True)
+ATTRIBUTION_FILE = DATA_DIR / "attribution.pkl"
+JOBS_DIR = DATA_DIR / "jobs"
+JOBS_DIR.mkdir(exist_ok=True)
+EXPORTS_DIR = DATA_DIR / "exports"
+EXPORTS_DIR.mkdir(exist_ok=True)
+MINHASH_DIR = DATA_DIR / "minhash"
+MINHASH_DIR.mkdir(exist_ok=True)
+# Signatures depend on these settings, so changing them starts a fresh store
+MINHASH_STORE = f"minhash-{MINHASH_PERMUTATIONS}-shingle{SHINGLE_SIZE}"
+FINGERPRINTS_DIR = DATA_DIR / "fingerprints"
+FINGERPRINTS_DIR.mkdir(exist_ok=True)
+FINGERPRINT_STORE = f"fingerprint-{FINGERPRINT_DIMS}-v{fingerprint.FINGERPRINT_VERSION}"
 
 class GenerateRequest(BaseModel):
     prompt: str
     model: str
+    stream: bool = False
 
 class BatchGenerateRequest(BaseModel):
     prompt_id: int
@@ -57,11 +88,100 @@ class EmbeddingRequest(BaseModel):
     models: Optional[List[str]] = None
     categories: Optional[List[str]] = None
     center_by_prompt: bool = True
+    embedding_model: Optional[str] = None
+    features: str = "embedding"
+
+class AttributionTrainRequest(BaseModel):
+    embedding_model: Optional[str] = None
+    features: str = "embedding"
+    n_splits: int = ATTRIBUTION_CV_FOLDS
+
+class AttributionRequest(BaseModel):
+    text: str
+    prompt_id: Optional[int] = None
+
+class CoveragePlanRequest(BaseModel):
+    models: Optional[List[str]] = None
+    categories: Optional[List[str]] = None
+    prompt_ids: Optional[List[int]] = None
+    samples_per_cell: int = 1
+    limit: Optional[int] = Field(None, ge=1)
+    enqueue: bool = False
+
+def build_telemetry(start: float, first_token: Optional[float], usage: Dict) -> Dict:
+    """Per-response latency and token counts, stored alongside the response text."""
+    return {
+        "ttft_ms": round((first_token - start) * 1000, 1) if first_token is not None else None,
+        "latency_ms": round((time.perf_counter() - start) * 1000, 1),
+        "prompt_tokens": usage.get("prompt_tokens"),
+        "completion_tokens": usage.get("completion_tokens"),
+    }
+
+async def stream_openrouter(prompt: str, model: str, telemetry: Dict):
+    """
+    Stream a completion from OpenRouter, yielding content deltas as they arrive.
+    Fills `telemetry` in place once the stream has finished.
+    """
+    start = time.perf_counter()
+    first_token = None
+    usage = {}
 
-async def call_openrouter(prompt: str, model: str) -> str:
+    async with httpx.AsyncClient() as client:
+        async with client.stream(
+            "POST",
+            OPENROUTER_URL,
+            headers={
+                "Authorization": f"Bearer {OPENROUTER_API_KEY}",
+                "Content-Type": "application/json",
+            },
+            json={
+                "model": model,
+                "messages": [{"role": "user", "content": prompt}],
+                "stream": True,
+                "usage": {"include": True},
+            },
+            timeout=60.0
+        ) as response:
+            response.raise_for_status()
+            async for line in response.aiter_lines():
+                # Skip blank lines and SSE comments (OpenRouter sends keep-alives)
+                if not line.startswith("data: "):
+                    continue
+                payload = line[len("data: "):]
+                if payload == "[DONE]":
+                    break
+
+                chunk = json.loads(payload)
+                if "error" in chunk:
+                    raise RuntimeError(chunk["error"].get("message", "Upstream error"))
+                if chunk.get("usage"):
+                    usage = chunk["usage"]
+
+                for choice in chunk.get("choices", []):
+                    delta = (choice.get("delta") or {}).get("content")
+                    if delta:
+                        if first_token is None:
+                            first_token = time.perf_counter()
+                        yield delta
+
+    telemetry.update(build_telemetry(start, first_token, usage))
+
+async def call_openrouter(prompt: str, model: str, stream: bool = STREAM_UPSTREAM) -> tuple[str, Dict]:
+    """
+    Get a full completion from OpenRouter.
+
+    Returns:
+        (response_text, telemetry). Time to first token is only known when streaming.
+    """
+    if stream:
+        telemetry = {}
+        deltas = [delta async for delta in stream_openrouter(prompt, model, telemetry)]
+        return "".join(deltas), telemetry
+
+    start = time.perf_counter()
     async with httpx.AsyncClient() as client:
         response = await client.post(
-            "https://openrouter.ai/api/v1/chat/completions",
+            OPENROUTER_URL,
             headers={
                 "Authorization": f"Bearer {OPENROUTER_API_KEY}",
                 "Content-Type": "application/json",
@@ -73,95 +193,414 @@ async def call_openrouter(prompt: str, model: str) -> str:
             timeout=60.0
         )
         response.raise_for_status()
-        return response.json()["choices"][0]["message"]["content"]
+        data = response.json()
+        return data["choices"][0]["message"]["content"], build_telemetry(start, None, data.get("usage") or {})
 
-def load_prompts():
-    with open(PROMPTS_FILE, "r") as f:
-        return json.load(f)
+# In-memory prompt registry, rebuilt only when prompts.json changes on disk
+_prompt_registry: Dict = {"prompts": None}
 
-def load_responses():
-    if RESPONSES_FILE.exists():
-        with open(RESPONSES_FILE, "r") as f:
-            return json.load(f)
-    return []
+def get_prompt_registry() -> Dict:
+    """
+    Prompts indexed by id and by category, and each prompt id's category.
 
-def save_response(prompt_id: int, prompt_text: str, model: str, response_text: str):
-    responses = load_responses()
+    prompts.json is only re-read when it changes on disk, so edits to the file
+    (or imports by another worker) are picked up without parsing it per request.
+    """
+    prompts = storage.read_json(PROMPTS_FILE)
+    if _prompt_registry["prompts"] is not prompts:
+        by_category = defaultdict(list)
+        for p in prompts:
+            by_category[p["category"]].append(p)
+
+        _prompt_registry.update({
+            "prompts": prompts,
+            "by_id": {p["id"]: p for p in prompts},
+            "by_category": dict(by_category),
+            "category_by_id": {p["id"]: p["category"] for p in prompts},
+        })
+    return _prompt_registry
+
+def load_prompts() -> List[Dict]:
+    return get_prompt_registry()["prompts"]
+
+def get_prompt(prompt_id: int) -> Optional[Dict]:
+    return get_prompt_registry()["by_id"].get(prompt_id)
+
+def get_prompt_categories() -> Dict[int, str]:
+    """Category of each prompt id. Fetch once per request, then look up per response."""
+    return get_prompt_registry()["category_by_id"]
+
+def load_responses() -> List[Dict]:
+    """Stored responses. Shared with other callers, so never mutate the returned list."""
+    return storage.read_json(RESPONSES_FILE, default=[])
+
+def save_response(prompt_id: int, prompt_text: str, model: str, response_text: str, telemetry: Optional[Dict] = None):
     response_obj = {
         "prompt_id": prompt_id,
         "prompt": prompt_text,
         "model": model,
-        "response": response_text
+        "response": response_text,
+        **(telemetry or {})
     }
-    responses.append(response_obj)
-    with open(RESPONSES_FILE, "w") as f:
-        json.dump(responses, f, indent=2)
+    with storage.locked(RESPONSES_FILE):
+        storage.atomic_write_json(RESPONSES_FILE, load_responses() + [response_obj])
+
+    # Sign on ingest so near-duplicate checks never have to catch up on the corpus
+    get_minhash_signatures([response_text])
     return response_obj
 
-def get_cached_response(prompt_id: int, model: str):
+# Response counts per (prompt_id, model) cell, rebuilt when responses change
+_coverage_index: Dict = {"responses": None}
+
+def get_coverage_index() -> Dict:
     responses = load_responses()
-    for resp in responses:
-        if resp.get("prompt_id") == prompt_id and resp["model"] == model:
-            return resp
-    return None
-
-def load_embeddings_cache() -> Dict:
-    """Load the embeddings cache from disk."""
-    if EMBEDDINGS_CACHE_FILE.exists():
+    if _coverage_index["responses"] is not responses:
+        counts = Counter()
+        first = {}
+        for r in responses:
+            cell = (r.get("prompt_id"), r["model"])
+            counts[cell] += 1
+            first.setdefault(cell, r)
+        _coverage_index.update({"responses": responses, "counts": counts, "first": first})
+    return _coverage_index
+
+def get_cached_response(prompt_id: int, model: str):
+    return get_coverage_index()["first"].get((prompt_id, model))
+
+# Resident sentence-transformers encoders, most recently used last.
+# Shared with background threads, so guarded by a lock.
+_embedders: "OrderedDict[str, object]" = OrderedDict()
+_embedders_lock = threading.Lock()
+
+def get_embedder(embedding_model: str):
+    """Load an embedding model on demand, evicting the least recently used one."""
+    with _embedders_lock:
+        if embedding_model in _embedders:
+            _embedders.move_to_end(embedding_model)
+            return _embedders[embedding_model]
+
+        from sentence_transformers import SentenceTransformer
+
+        # Loaded while holding the lock, so two threads never load the same model twice
+        embedder = SentenceTransformer(embedding_model)
+        _embedders[embedding_model] = embedder
+        while len(_embedders) > MAX_RESIDENT_EMBEDDERS:
+            _embedders.popitem(last=False)
+        return embedder
+
+def evict_embedder(embedding_model: str) -> bool:
+    """Drop a resident encoder. Returns True if it was loaded."""
+    with _embedders_lock:
+        return _embedders.pop(embedding_model, None) is not None
+
+def list_resident_embedders() -> List[str]:
+    with _embedders_lock:
+        return list(_embedders.keys())
+
+def migrate_embeddings_cache():
+    """
+    Move vectors from the old JSON cache into the per-model embedding stores.
+    Handles both the single-model v1 layout and the per-model v2 layout.
+    """
+    if not EMBEDDINGS_CACHE_FILE.exists():
+        return
+
+    with storage.locked(EMBEDDINGS_CACHE_FILE):
+        if not EMBEDDINGS_CACHE_FILE.exists():
+            return
+
         with open(EMBEDDINGS_CACHE_FILE, "r") as f:
             cache = json.load(f)
-            # Invalidate cache if embedding model changed
-            if cache.get("embedding_model") != EMBEDDING_MODEL:
-                return {
-                    "cache_version": "1",
-                    "embedding_model": EMBEDDING_MODEL,
-                    "embeddings": {}
-                }
-            return cache
-    return {
-        "cache_version": "1",
-        "embedding_model": EMBEDDING_MODEL,
-        "embeddings": {}
-    }
 
-def save_embeddings_cache(cache: Dict):
-    """Save the embeddings cache to disk."""
-    with open(EMBEDDINGS_CACHE_FILE, "w") as f:
-        json.dump(cache, f, indent=2)
+        if cache.get("cache_version") == "1":
+            by_model = {cache.get("embedding_model"): cache.get("embeddings", {})}
+        else:
+            by_model = cache.get("embeddings", {})
+
+        for embedding_model, vectors in by_model.items():
+            if embedding_model and vectors:
+                storage.append_embeddings(EMBEDDINGS_DIR, embedding_model, list(vectors.keys()), np.array(list(vectors.values())))
+
+        EMBEDDINGS_CACHE_FILE.rename(EMBEDDINGS_CACHE_FILE.with_suffix(".json.migrated"))
+
+migrate_embeddings_cache()
+
+def get_stored_vectors(root: Path, name: str, texts: List[str], compute, dtype: str = "float32") -> tuple[np.ndarray, int]:
+    """
+    Per-text vectors from an append-only store, computing and storing only the
+    texts it does not have yet. Returns (vectors, number computed).
+    """
+    store = storage.open_embedding_store(root, name)
+    index = store["index"] if store else {}
+    hashes = [get_response_hash(text) for text in texts]
+
+    missing = {h: text for h, text in zip(hashes, texts) if h not in index}
+    if missing:
+        storage.append_embeddings(root, name, list(missing.keys()), compute(list(missing.values())), dtype=dtype)
+        store = storage.open_embedding_store(root, name)
+
+    if not texts:
+        return compute([]), 0
+    return np.asarray(store["vectors"][[store["index"][h] for h in hashes]]), len(missing)
+
+def get_minhash_signatures(texts: List[str]) -> np.ndarray:
+    """MinHash signatures for texts, computing and storing only the missing ones."""
+    signatures, _ = get_stored_vectors(MINHASH_DIR, MINHASH_STORE, texts, near_duplicates.minhash_signatures, dtype="uint32")
+    return signatures
+
+def list_cached_embedding_models() -> List[str]:
+    return storage.list_embedding_models(EMBEDDINGS_DIR)
+
+def resolve_embedding_model(embedding_model: Optional[str], allow_cached: bool = False) -> str:
+    """
+    The requested embedding model, or EMBEDDING_MODEL if none was given.
+    Only models in EMBEDDING_MODELS are accepted (plus, with allow_cached,
+    models that still have a cache on disk), so a client can never make us
+    download an arbitrary model or touch paths outside the embeddings directory.
+    """
+    if embedding_model is None:
+        return EMBEDDING_MODEL
+    if embedding_model in EMBEDDING_MODELS or (allow_cached and embedding_model in list_cached_embedding_models()):
+        return embedding_model
+    raise HTTPException(
+        status_code=400,
+        detail=f"Unknown embedding model '{embedding_model}'. Choose from: {EMBEDDING_MODELS}"
+    )
 
 def get_response_hash(response_text: str) -> str:
     """Generate a hash for a response text to use as cache key."""
     return hashlib.sha256(response_text.encode('utf-8')).hexdigest()
 
-def get_cached_embeddings(texts: List[str]) -> tuple[np.ndarray, List[int]]:
+def get_cached_embeddings(texts: List[str], embedding_model: str = EMBEDDING_MODEL) -> tuple[list, List[int]]:
     """
     Get embeddings from cache. Returns embeddings array and list of indices that need computation.
 
     Returns:
         (embeddings, uncached_indices) where embeddings has None for uncached items
     """
-    cache = load_embeddings_cache()
+    store = storage.open_embedding_store(EMBEDDINGS_DIR, embedding_model)
+    index = store["index"] if store else {}
     embeddings = [None] * len(texts)
     uncached_indices = []
 
     for i, text in enumerate(texts):
-        text_hash = get_response_hash(text)
-        if text_hash in cache["embeddings"]:
-            embeddings[i] = np.array(cache["embeddings"][text_hash])
+        row = index.get(get_response_hash(text))
+        if row is not None:
+            embeddings[i] = np.array(store["vectors"][row])
         else:
             uncached_indices.append(i)
 
     return embeddings, uncached_indices
 
-def save_embeddings_to_cache(texts: List[str], embeddings: np.ndarray):
+def save_embeddings_to_cache(texts: List[str], embeddings: np.ndarray, embedding_model: str = EMBEDDING_MODEL):
     """Save computed embeddings to cache."""
-    cache = load_embeddings_cache()
+    storage.append_embeddings(
+        EMBEDDINGS_DIR, embedding_model, [get_response_hash(text) for text in texts], embeddings
+    )
+
+def purge_embeddings_cache(embedding_model: str) -> int:
+    """Remove all cached vectors for an embedding model. Returns how many were removed."""
+    return storage.purge_embeddings(EMBEDDINGS_DIR, embedding_model)
+
+def encode_texts(texts: List[str], embedding_model: str = EMBEDDING_MODEL) -> np.ndarray:
+    """Run the embedding model without touching the cache."""
+    model = get_embedder(embedding_model)
+    # batch_size controls GPU/CPU batching, show_progress_bar disabled for API
+    return model.encode(
+        texts,
+        show_progress_bar=False,
+        batch_size=32,  # Process 32 texts at once
+        convert_to_numpy=True
+    )
+
+def embed_texts(texts: List[str], embedding_model: str = EMBEDDING_MODEL) -> tuple[np.ndarray, Dict]:
+    """
+    Embed texts, computing only those missing from the cache.
+
+    Returns:
+        (embeddings, cache_stats)
+    """
+    cached_embeddings, uncached_indices = get_cached_embeddings(texts, embedding_model)
+
+    # Compute embeddings only for uncached texts
+    if uncached_indices:
+        uncached_texts = [texts[i] for i in uncached_indices]
+        newly_computed = encode_texts(uncached_texts, embedding_model)
+
+        # Fill in the newly computed embeddings
+        for idx, embedding in zip(uncached_indices, newly_computed):
+            cached_embeddings[idx] = embedding
 
-    for text, embedding in zip(texts, embeddings):
-        text_hash = get_response_hash(text)
-        cache["embeddings"][text_hash] = embedding.tolist()
+        # Save newly computed embeddings to cache
+        save_embeddings_to_cache(uncached_texts, newly_computed, embedding_model)
+
+    cache_stats = {
+        "total_embeddings": len(texts),
+        "cached": len(texts) - len(uncached_indices),
+        "computed": len(uncached_indices)
+    }
+    return np.array(cached_embeddings), cache_stats
+
+def featurize(
+    texts: List[str], features: str = "embedding", embedding_model: str = EMBEDDING_MODEL, cache: bool = True
+) -> tuple[np.ndarray, Dict]:
+    """
+    Turn texts into vectors with the selected feature set.
 
-    save_embeddings_cache(cache)
+    "embedding" uses the (cached) sentence-transformers model, "fingerprint"
+    uses transformer-free stylometric features, stored per response the same way.
+    Pass cache=False for texts that are not stored responses, such as queries,
+    so they never end up in the shared stores.
+
+    Returns:
+        (vectors, cache_stats)
+    """
+    if features not in FEATURE_SETS:
+        raise HTTPException(status_code=400, detail=f"Unknown features '{features}'. Choose from: {FEATURE_SETS}")
+
+    if not cache:
+        if features == "fingerprint":
+            vectors = fingerprint.fingerprint_texts(texts)
+        else:
+            vectors = encode_texts(texts, embedding_model)
+        return vectors, {
+            "total_embeddings": len(texts),
+            "cached": 0,
+            "computed": len(texts)
+        }
+
+    if features == "fingerprint":
+        vectors, computed = get_stored_vectors(FINGERPRINTS_DIR, FINGERPRINT_STORE, texts, fingerprint.fingerprint_texts)
+        return vectors, {
+            "total_embeddings": len(texts),
+            "cached": len(texts) - computed,
+            "computed": computed
+        }
+
+    return embed_texts(texts, embedding_model)
+
+def center_embeddings_by_prompt(embeddings: np.ndarray, prompt_ids: List) -> np.ndarray:
+    """Subtract the mean embedding of each prompt's responses, isolating model-specific differences."""
+    prompt_indices = defaultdict(list)
+    for i, prompt_id in enumerate(prompt_ids):
+        prompt_indices[prompt_id].append(i)
+
+    centered_embeddings = embeddings.copy()
+    for indices in prompt_indices.values():
+        centered_embeddings[indices] = embeddings[indices] - embeddings[indices].mean(axis=0)
+
+    return centered_embeddings
+
+# Attribution probe state as last read from ATTRIBUTION_FILE
+_attribution_cache: Dict = {"signature": None, "state": None}
+_attribution_cache_lock = threading.Lock()
+
+def get_attribution_state() -> Optional[Dict]:
+    """The latest saved probe, reloaded whenever any worker has saved a newer one."""
+    with _attribution_cache_lock:
+        signature = storage.file_signature(ATTRIBUTION_FILE)
+        if signature != _attribution_cache["signature"]:
+            _attribution_cache["state"] = attribution.load_state(ATTRIBUTION_FILE)
+            _attribution_cache["signature"] = signature
+        return _attribution_cache["state"]
+
+def save_attribution_state(state: Dict):
+    with _attribution_cache_lock:
+        attribution.save_state(state, ATTRIBUTION_FILE)
+        _attribution_cache["state"] = state
+        _attribution_cache["signature"] = storage.file_signature(ATTRIBUTION_FILE)
+
+def attribution_key(response: Dict) -> str:
+    """Identify a response for the probe's trained set. The same text from two models is two samples."""
+    return f"{response['model']}:{get_response_hash(response['response'])}"
+
+# Responses the probe can learn from and their attribution keys, rebuilt when
+# responses change. Each rebuild publishes a new dict, so corpus and keys always match.
+_attribution_corpus: Dict = {"responses": None, "corpus": [], "keys": []}
+_attribution_corpus_lock = threading.Lock()
+
+def get_attribution_corpus() -> Dict:
+    """Stored responses the probe can learn from: those of configured models with a prompt id."""
+    global _attribution_corpus
+    responses = load_responses()
+    with _attribution_corpus_lock:
+        previous = _attribution_corpus
+        if previous["responses"] is not responses:
+            corpus = [r for r in responses if r["model"] in MODELS and r.get("prompt_id") is not None]
+            # Responses are appended, so keys for the unchanged prefix can be reused
+            # and usually only the new tail is hashed
+            reused = 0
+            for old, new in zip(previous["corpus"], corpus):
+                if old["model"] != new["model"] or old["response"] != new["response"]:
+                    break
+                reused += 1
+            _attribution_corpus = {
+                "responses": responses,
+                "corpus": corpus,
+                "keys": previous["keys"][:reused] + [attribution_key(r) for r in corpus[reused:]],
+            }
+        return _attribution_corpus
+
+def find_untrained_responses(state: Dict) -> List[Dict]:
+    corpus = get_attribution_corpus()
+    return [
+        r for r, key in zip(corpus["corpus"], corpus["keys"])
+        if key not in state["trained_hashes"]
+    ]
+
+# Single-flight guard for probe syncs, and the (responses, probe) file signatures
+# the last completed sync covered
+_attribution_sync_lock = threading.Lock()
+_attribution_sync: Dict = {"sources": None}
+
+def sync_attribution_state() -> int:
+    """
+    Incrementally train the saved probe on responses it has not seen yet.
+
+    Runs as a background task after responses are saved, never while serving
+    a prediction. At most one sync runs per worker; others return immediately,
+    as does a sync when neither the responses nor the probe changed since the
+    last one. Returns the number of responses newly trained on.
+    """
+    if not _attribution_sync_lock.acquire(blocking=False):
+        return 0
+
+    try:
+        responses_signature = storage.file_signature(RESPONSES_FILE)
+        if (responses_signature, storage.file_signature(ATTRIBUTION_FILE)) == _attribution_sync["sources"]:
+            return 0
+
+        newly_trained = _sync_attribution_state()
+        # Record the responses signature from before the sync, so responses
+        # saved while it ran are picked up next time
+        _attribution_sync["sources"] = (responses_signature, storage.file_signature(ATTRIBUTION_FILE))
+        return newly_trained
+    finally:
+        _attribution_sync_lock.release()
+
+def _sync_attribution_state() -> int:
+    state = get_attribution_state()
+    if state is None or not find_untrained_responses(state):
+        return 0
+
+    with storage.locked(ATTRIBUTION_FILE):
+        # Update a fresh copy: requests may be predicting with the cached state,
+        # and another worker may have synced (or retrained) while we waited for the lock
+        state = attribution.load_state(ATTRIBUTION_FILE)
+        new_responses = find_untrained_responses(state) if state else []
+        if not new_responses:
+            return 0
+
+        embeddings, _ = featurize([r["response"] for r in new_responses], state["features"], state["embedding_model"])
+        attribution.update_state(
+            state,
+            embeddings,
+            [r["prompt_id"] for r in new_responses],
+            [r["model"] for r in new_responses],
+            [attribution_key(r) for r in new_responses],
+        )
+        save_attribution_state(state)
+    return len(new_responses)
 
 @app.get("/config")
 async def get_config():
@@ -169,37 +608,123 @@ async def get_config():
     return {
         "models": list(MODELS.keys()),
         "model_providers": MODELS,
-        "embedding_model": EMBEDDING_MODEL
+        "embedding_model": EMBEDDING_MODEL,
+        "embedding_models": EMBEDDING_MODELS,
+        "feature_sets": FEATURE_SETS,
+        "cached_embedding_models": list_cached_embedding_models(),
+        "resident_embedding_models": list_resident_embedders()
     }
 
 @app.get("/prompts")
-async def get_prompts():
+async def get_prompts(category: Optional[str] = None):
+    if category is not None:
+        return get_prompt_registry()["by_category"].get(category, [])
     return load_prompts()
 
+@app.post("/prompts/import")
+async def import_prompts(request: Request, category: Optional[str] = None):
+    """
+    Bulk-import a prompt suite as JSONL, one {"text", "category"} object per line.
+
+    `category` is used for lines that do not set one. Prompts whose text and
+    category are already registered are skipped; new prompts get fresh ids.
+    """
+    try:
+        body = (await request.body()).decode("utf-8")
+    except UnicodeDecodeError:
+        raise HTTPException(status_code=400, detail="Body must be UTF-8 encoded JSONL")
+
+    with storage.locked(PROMPTS_FILE):
+        return merge_prompt_suite(body, category)
+
+def merge_prompt_suite(body: str, category: Optional[str]) -> Dict:
+    prompts = list(load_prompts())
+    existing = {(p["text"], p["category"]) for p in prompts}
+    next_id = max((p["id"] for p in prompts), default=0) + 1
+
+    imported = 0
+    skipped = 0
+    for line_number, line in enumerate(body.splitlines(), start=1):
+        if not line.strip():
+            continue
+        try:
+            item = json.loads(line)
+            text = item["text"]
+            prompt_category = item.get("category") or category
+        except (json.JSONDecodeError, KeyError, TypeError, AttributeError):
+            raise HTTPException(status_code=400, detail=f"Line {line_number}: expected a JSON object with a 'text' field")
+
+        if not isinstance(text, str) or not text.strip():
+            raise HTTPException(status_code=400, detail=f"Line {line_number}: 'text' must be a non-empty string")
+        if not prompt_category:
+            raise HTTPException(status_code=400, detail=f"Line {line_number}: missing 'category'")
+        if not isinstance(prompt_category, str):
+            raise HTTPException(status_code=400, detail=f"Line {line_number}: 'category' must be a string")
+
+        if (text, prompt_category) in existing:
+            skipped += 1
+            continue
+
+        prompts.append({"id": next_id, "text": text, "category": prompt_category})
+        existing.add((text, prompt_category))
+        next_id += 1
+        imported += 1
+
+    if imported:
+        storage.atomic_write_json(PROMPTS_FILE, prompts)
+
+    return {"imported": imported, "skipped": skipped, "total_prompts": len(prompts)}
+
 @app.post("/generate")
 async def generate(req: GenerateRequest):
     if not OPENROUTER_API_KEY:
         raise HTTPException(status_code=500, detail="OPENROUTER_API_KEY not set")
 
+    if req.stream:
+        return StreamingResponse(relay_generation(req), media_type="text/event-stream")
+
     try:
-        response_text = await call_openrouter(req.prompt, req.model)
+        response_text, telemetry = await call_openrouter(req.prompt, req.model)
         response_obj = {
             "prompt": req.prompt,
             "model": req.model,
-            "response": response_text
+            "response": response_text,
+            **telemetry
         }
         return response_obj
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+async def relay_generation(req: GenerateRequest):
+    """
+    Relay upstream tokens as server-sent events: one {"delta"} event per chunk,
+    then a final {"done", "response"} event carrying the full response and telemetry.
+    """
+    telemetry = {}
+    deltas = []
+    try:
+        async for delta in stream_openrouter(req.prompt, req.model, telemetry):
+            deltas.append(delta)
+            yield f"data: {json.dumps({'delta': delta})}\n\n"
+    except Exception as e:
+        yield f"data: {json.dumps({'error': str(e)})}\n\n"
+        return
+
+    response_obj = {
+        "prompt": req.prompt,
+        "model": req.model,
+        "response": "".join(deltas),
+        **telemetry
+    }
+    yield f"data: {json.dumps({'done': True, 'response': response_obj})}\n\n"
+
 @app.post("/generate-batch")
-async def generate_batch(req: BatchGenerateRequest):
+async def generate_batch(req: BatchGenerateRequest, background_tasks: BackgroundTasks):
     if not OPENROUTER_API_KEY:
         raise HTTPException(status_code=500, detail="OPENROUTER_API_KEY not set")
 
     try:
-        prompts = load_prompts()
-        prompt = next((p for p in prompts if p["id"] == req.prompt_id), None)
+        prompt = get_prompt(req.prompt_id)
         if not prompt:
             raise HTTPException(status_code=404, detail="Prompt not found")
 
@@ -212,10 +737,12 @@ async def generate_batch(req: BatchGenerateRequest):
                 continue
 
             # Generate new response
-            response_text = await call_openrouter(prompt["text"], model)
-            response_obj = save_response(req.prompt_id, prompt["text"], model, response_text)
+            response_text, telemetry = await call_openrouter(prompt["text"], model)
+            response_obj = save_response(req.prompt_id, prompt["text"], model, response_text, telemetry)
             results.append({"model": model, "cached": False, "response": response_obj})
 
+        if any(not r["cached"] for r in results):
+            background_tasks.add_task(sync_attribution_state)
         return results
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -224,17 +751,240 @@ async def generate_batch(req: BatchGenerateRequest):
 async def get_responses():
     return load_responses()
 
+@app.get("/telemetry")
+async def get_telemetry():
+    """
+    Per-model latency and throughput from stored responses, for scheduling batch runs.
+    Responses saved before telemetry was recorded are skipped.
+    """
+    per_model = defaultdict(lambda: defaultdict(list))
+    for r in load_responses():
+        for field in ("ttft_ms", "latency_ms", "completion_tokens"):
+            if r.get(field) is not None:
+                per_model[r["model"]][field].append(r[field])
+        if r.get("completion_tokens") and r.get("latency_ms"):
+            per_model[r["model"]]["tokens_per_second"].append(r["completion_tokens"] / (r["latency_ms"] / 1000))
+
+    return {
+        model: {
+            "responses": len(fields["latency_ms"]),
+            "median_ttft_ms": float(np.median(fields["ttft_ms"])) if fields["ttft_ms"] else None,
+            "median_latency_ms": float(np.median(fields["latency_ms"])) if fields["latency_ms"] else None,
+            "mean_completion_tokens": float(np.mean(fields["completion_tokens"])) if fields["completion_tokens"] else None,
+            "median_tokens_per_second": float(np.median(fields["tokens_per_second"])) if fields["tokens_per_second"] else None,
+        }
+        for model, fields in per_model.items()
+    }
+
+def select_prompts(categories: Optional[List[str]] = None, prompt_ids: Optional[List[int]] = None) -> List[Dict]:
+    """Prompts by explicit id, else by category, else all of them."""
+    registry = get_prompt_registry()
+    if prompt_ids is not None:
+        return [registry["by_id"][pid] for pid in prompt_ids if pid in registry["by_id"]]
+    if categories:
+        return [p for category in categories for p in registry["by_category"].get(category, [])]
+    return registry["prompts"]
+
+@app.get("/coverage")
+async def get_coverage(
+    models: Optional[List[str]] = Query(None),
+    categories: Optional[List[str]] = Query(None),
+):
+    """
+    Prompt x model response counts as a compact matrix:
+    counts[i][j] is the number of responses to prompt_ids[i] from models[j].
+    """
+    models = models or list(MODELS.keys())
+    prompts = select_prompts(categories)
+    counts = get_coverage_index()["counts"]
+
+    matrix = [[counts[(p["id"], model)] for model in models] for p in prompts]
+    return {
+        "prompt_ids": [p["id"] for p in prompts],
+        "models": models,
+        "counts": matrix,
+        "complete_prompts": sum(1 for row in matrix if all(row)),
+        "filled_cells": sum(1 for row in matrix for count in row if count),
+        "total_cells": len(prompts) * len(models)
+    }
+
+def plan_missing_cells(prompts: List[Dict], models: List[str], samples_per_cell: int) -> List[Dict]:
+    """
+    Cells still short of samples_per_cell responses, in generation order.
+
+    Prompts closest to complete come first so they become usable for centering
+    sooner. Within a prompt, models are interleaved by provider, rotating which
+    provider leads, so consecutive requests spread across providers.
+    """
+    counts = get_coverage_index()["counts"]
+    per_prompt = []
+    for p in prompts:
+        cells = [
+            {"prompt_id": p["id"], "model": model, "missing": samples_per_cell - counts[(p["id"], model)]}
+            for model in models
+            if counts[(p["id"], model)] < samples_per_cell
+        ]
+        if cells:
+            per_prompt.append(cells)
+
+    per_prompt.sort(key=lambda cells: sum(c["missing"] for c in cells))
+
+    ordered = []
+    for i, cells in enumerate(per_prompt):
+        by_provider = defaultdict(list)
+        for cell in cells:
+            by_provider[MODELS.get(cell["model"], "unknown")].append(cell)
+        providers = sorted(by_provider)
+        providers = providers[i % len(providers):] + providers[:i % len(providers)]
+        while any(by_provider.values()):
+            for provider in providers:
+                if by_provider[provider]:
+                    ordered.append(by_provider[provider].pop(0))
+    return ordered
+
+def save_job(job: Dict):
+    """
+    Persist the job header: status and counters only. Per-cell progress is
+    appended to the job's log instead, so a save costs the same for any size of job.
+    """
+    job["heartbeat"] = time.time()
+    storage.atomic_write_json(JOBS_DIR / f"{job['job_id']}.json", job)
+
+def log_job_cell(job: Dict, cell: Dict):
+    """Append a cell's current status to the job log, one JSON object per line."""
+    with open(JOBS_DIR / f"{job['job_id']}.log", "a") as f:
+        f.write(json.dumps(cell) + "\n")
+
+def read_job_log(job_id: str, since: int):
+    """Cell updates logged from byte offset `since`, and the offset to resume from."""
+    try:
+        with open(JOBS_DIR / f"{job_id}.log", "rb") as f:
+            f.seek(since)
+            data = f.read()
+    except FileNotFoundError:
+        return [], since
+    # Leave a line that is still being written for the next poll
+    complete = data[:data.rfind(b"\n") + 1]
+    updates = [json.loads(line) for line in complete.splitlines()]
+    return updates, since + len(complete)
+
+async def run_plan(job: Dict, cells: List[Dict], samples_per_cell: int):
+    """
+    Generate the job's cells with one queue per provider, so providers are
+    called concurrently and a slow provider does not hold up the others.
+    Each cell's status moves from "queued" to "running" to "completed" or "failed".
+    """
+    queues = defaultdict(list)
+    for cell in cells:
+        queues[MODELS.get(cell["model"], "unknown")].append(cell)
+
+    async def drain(provider_cells: List[Dict]):
+        for cell in provider_cells:
+            prompt = get_prompt(cell["prompt_id"])
+            cell["status"] = "running"
+            log_job_cell(job, cell)
+            # Re-check coverage: another batch may have filled the cell meanwhile
+            while get_coverage_index()["counts"][(cell["prompt_id"], cell["model"])] < samples_per_cell:
+                try:
+                    response_text, telemetry = await call_openrouter(prompt["text"], cell["model"])
+                    save_response(cell["prompt_id"], prompt["text"], cell["model"], response_text, telemetry)
+                    job["generated"] += 1
+                except Exception as e:
+                    cell.update({"status": "failed", "error": str(e)})
+                    job["failed_cells"] += 1
+                    break
+            if cell["status"] == "running":
+                cell["status"] = "completed"
+            job["completed_cells"] += 1
+            log_job_cell(job, cell)
+
+    async def heartbeat():
+        while True:
+            await asyncio.sleep(JOB_HEARTBEAT_SECONDS)
+            save_job(job)
+
+    heartbeat_task = asyncio.create_task(heartbeat())
+    try:
+        await asyncio.gather(*(drain(provider_cells) for provider_cells in queues.values()))
+    except Exception as e:
+        job.update({"status": "failed", "error": str(e)})
+        save_job(job)
+        raise
+    finally:
+        heartbeat_task.cancel()
+    job["status"] = "completed"
+    save_job(job)
+
+    if job["generated"]:
+        await asyncio.to_thread(sync_attribution_state)
+
+@app.post("/coverage/plan")
+async def plan_coverage(req: CoveragePlanRequest, background_tasks: BackgroundTasks):
+    """
+    Plan the cells that still need responses. With enqueue=true the plan is
+    also generated in the background; poll /coverage/jobs/{job_id} for progress.
+    """
+    if req.samples_per_cell < 1:
+        raise HTTPException(status_code=400, detail="samples_per_cell must be at least 1")
+
+    models = req.models or list(MODELS.keys())
+    cells = plan_missing_cells(select_prompts(req.categories, req.prompt_ids), models, req.samples_per_cell)
+    if req.limit is not None:
+        cells = cells[:req.limit]
+
+    result = {
+        "cells": cells,
+        "total_cells": len(cells),
+        "total_samples": sum(c["missing"] for c in cells),
+        "job_id": None
+    }
+
+    if req.enqueue and cells:
+        if not OPENROUTER_API_KEY:
+            raise HTTPException(status_code=500, detail="OPENROUTER_API_KEY not set")
+
+        job = {
+            "job_id": uuid.uuid4().hex,
+            "status": "running",
+            "total_cells": len(cells),
+            "completed_cells": 0,
+            "failed_cells": 0,
+            "generated": 0
+        }
+        save_job(job)
+        job_cells = [{"prompt_id": c["prompt_id"], "model": c["model"], "status": "queued"} for c in cells]
+        background_tasks.add_task(run_plan, job, job_cells, req.samples_per_cell)
+        result["job_id"] = job["job_id"]
+
+    return result
+
+@app.get("/coverage/jobs/{job_id}")
+async def get_coverage_job(job_id: str, since: int = Query(0, ge=0)):
+    """
+    Job status and counters, plus the cell updates logged after byte offset
+    `since`. Pass the returned next_offset as `since` on the next poll.
+    """
+    job = storage.read_json(JOBS_DIR / f"{job_id}.json")
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    job = dict(job)
+    if job["status"] == "running" and time.time() - job["heartbeat"] > JOB_STALE_SECONDS:
+        job.update({"status": "failed", "error": "Job stopped responding; its worker probably exited"})
+
+    job["updates"], job["next_offset"] = read_job_log(job_id, since)
+    return job
+
 @app.post("/generate-batch-multiple")
-async def generate_batch_multiple(req: BatchGenerateMultipleRequest):
+async def generate_batch_multiple(req: BatchGenerateMultipleRequest, background_tasks: BackgroundTasks):
     if not OPENROUTER_API_KEY:
         raise HTTPException(status_code=500, detail="OPENROUTER_API_KEY not set")
 
     try:
-        prompts_data = load_prompts()
         results = []
 
         for prompt_id in req.prompt_ids:
-            prompt = next((p for p in prompts_data if p["id"] == prompt_id), None)
+            prompt = get_prompt(prompt_id)
             if not prompt:
                 results.append({
                     "prompt_id": prompt_id,
@@ -253,8 +1003,8 @@ async def generate_batch_multiple(req: BatchGenerateMultipleRequest):
 
                 # Generate new response
                 try:
-                    response_text = await call_openrouter(prompt["text"], model)
-                    response_obj = save_response(prompt_id, prompt["text"], model, response_text)
+                    response_text, telemetry = await call_openrouter(prompt["text"], model)
+                    response_obj = save_response(prompt_id, prompt["text"], model, response_text, telemetry)
                     model_results.append({"model": model, "cached": False, "response": response_obj})
                 except Exception as e:
                     model_results.append({"model": model, "error": str(e)})
@@ -264,20 +1014,21 @@ async def generate_batch_multiple(req: BatchGenerateMultipleRequest):
                 "models": model_results
             })
 
+        background_tasks.add_task(sync_attribution_state)
         return results
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.delete("/responses/{prompt_id}")
 async def delete_response(prompt_id: int, model: str):
-    responses = load_responses()
-    updated = [r for r in responses if not (r.get("prompt_id") == prompt_id and r["model"] == model)]
+    with storage.locked(RESPONSES_FILE):
+        responses = load_responses()
+        updated = [r for r in responses if not (r.get("prompt_id") == prompt_id and r["model"] == model)]
 
-    if len(updated) == len(responses):
-        raise HTTPException(status_code=404, detail="Response not found")
+        if len(updated) == len(responses):
+            raise HTTPException(status_code=404, detail="Response not found")
 
-    with open(RESPONSES_FILE, "w") as f:
-        json.dump(updated, f, indent=2)
+        storage.atomic_write_json(RESPONSES_FILE, updated)
 
     return {"deleted": True}
 
@@ -288,15 +1039,11 @@ async def visualize_embeddings(req: EmbeddingRequest):
     Returns 2D coordinates for visualization.
     """
     try:
-        from sentence_transformers import SentenceTransformer
         from umap import UMAP
 
         # Load data
         responses = load_responses()
-        prompts = load_prompts()
-
-        # Create prompt category lookup
-        prompt_categories = {p["id"]: p["category"] for p in prompts}
+        prompt_categories = get_prompt_categories()
 
         # Filter responses
         filtered_responses = responses
@@ -314,53 +1061,15 @@ async def visualize_embeddings(req: EmbeddingRequest):
             raise HTTPException(status_code=400, detail="Need at least 2 responses to visualize")
 
         # Embed responses with caching
+        embedding_model = resolve_embedding_model(req.embedding_model)
         texts = [r["response"] for r in filtered_responses]
-        cached_embeddings, uncached_indices = get_cached_embeddings(texts)
-
-        # Compute embeddings only for uncached texts
-        if uncached_indices:
-            model = SentenceTransformer(EMBEDDING_MODEL)
-            uncached_texts = [texts[i] for i in uncached_indices]
-            # Use parallel processing for faster batch encoding
-            # batch_size controls GPU/CPU batching, show_progress_bar disabled for API
-            newly_computed = model.encode(
-                uncached_texts,
-                show_progress_bar=False,
-                batch_size=32,  # Process 32 texts at once
-                convert_to_numpy=True
-            )
-
-            # Fill in the newly computed embeddings
-            for idx, embedding in zip(uncached_indices, newly_computed):
-                cached_embeddings[idx] = embedding
-
-            # Save newly computed embeddings to cache
-            save_embeddings_to_cache(uncached_texts, newly_computed)
-
-        # Convert to numpy array
-        embeddings = np.array(cached_embeddings)
+        embeddings, cache_stats = featurize(texts, req.features, embedding_model)
 
         # Center by prompt if requested
         if req.center_by_prompt:
-            # Group embeddings by prompt_id
-            prompt_embeddings = defaultdict(list)
-            prompt_indices = defaultdict(list)
-
-            for i, response in enumerate(filtered_responses):
-                prompt_id = response.get("prompt_id", "N/A")
-                prompt_embeddings[prompt_id].append(embeddings[i])
-                prompt_indices[prompt_id].append(i)
-
-            # Subtract mean for each prompt
-            centered_embeddings = embeddings.copy()
-            for prompt_id, embedding_list in prompt_embeddings.items():
-                embedding_array = np.array(embedding_list)
-                mean_embedding = embedding_array.mean(axis=0)
-
-                for idx in prompt_indices[prompt_id]:
-                    centered_embeddings[idx] = embeddings[idx] - mean_embedding
-
-            embeddings = centered_embeddings
+            embeddings = center_embeddings_by_prompt(
+                embeddings, [r.get("prompt_id", "N/A") for r in filtered_responses]
+            )
 
         # Reduce dimensions with UMAP
         reducer = UMAP(
@@ -391,13 +1100,13 @@ async def visualize_embeddings(req: EmbeddingRequest):
             "data": visualization_data,
             "centered": req.center_by_prompt,
             "total_points": len(visualization_data),
-            "cache_stats": {
-                "total_embeddings": len(texts),
-                "cached": len(texts) - len(uncached_indices),
-                "computed": len(uncached_indices)
-            }
+            "embedding_model": embedding_model,
+            "features": req.features,
+            "cache_stats": cache_stats
         }
 
+    except HTTPException:
+        raise
     except ImportError as e:
         raise HTTPException(
             status_code=500,
@@ -406,6 +1115,287 @@ async def visualize_embeddings(req: EmbeddingRequest):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.delete("/embeddings/cache/{embedding_model:path}")
+async def purge_embeddings(embedding_model: str):
+    """
+    Purge cached vectors for an embedding model we no longer want, along
+    with its exported snapshots, and unload its encoder if it is resident.
+    Models dropped from EMBEDDING_MODELS can still be purged while their cache exists.
+    """
+    embedding_model = resolve_embedding_model(embedding_model, allow_cached=True)
+    removed = purge_embeddings_cache(embedding_model)
+    removed_snapshots = export.remove_snapshots(EXPORTS_DIR, export.embeddings_snapshot_name(embedding_model))
+    unloaded = evict_embedder(embedding_model)
+
+    if not removed and not removed_snapshots and not unloaded:
+        raise HTTPException(status_code=404, detail="Embedding model not cached")
+
+    return {
+        "purged": True,
+        "embedding_model": embedding_model,
+        "removed": removed,
+        "removed_snapshots": removed_snapshots,
+        "unloaded": unloaded
+    }
+
+@app.post("/attribute/train")
+def train_attribution(req: AttributionTrainRequest):
+    """
+    Train the model-attribution probe from scratch on prompt-centered embeddings.
+    Returns prompt-grouped cross-validated accuracy and a confusion matrix over MODELS.
+
+    A plain def, so FastAPI runs it in the threadpool: embedding, fitting and
+    waiting for a background sync's lock never stall the event loop.
+    """
+    try:
+        corpus = get_attribution_corpus()
+        responses = corpus["corpus"]
+        if len(responses) < 2:
+            raise HTTPException(status_code=400, detail="Need at least 2 responses to train")
+
+        embedding_model = resolve_embedding_model(req.embedding_model)
+        embeddings, cache_stats = featurize([r["response"] for r in responses], req.features, embedding_model)
+        prompt_ids = [r["prompt_id"] for r in responses]
+        labels = [r["model"] for r in responses]
+
+        try:
+            cv = attribution.cross_validate(
+                center_embeddings_by_prompt(embeddings, prompt_ids),
+                np.array(labels, dtype=object),
+                np.array(prompt_ids),
+                req.n_splits,
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+        state = attribution.new_state(embedding_model, req.features)
+        attribution.fit_state(state, embeddings, prompt_ids, labels, corpus["keys"])
+        state["cv"] = cv
+        with storage.locked(ATTRIBUTION_FILE):
+            save_attribution_state(state)
+
+        return {
+            "embedding_model": embedding_model,
+            "features": req.features,
+            "trained_responses": len(responses),
+            "cross_validation": cv,
+            "cache_stats": cache_stats
+        }
+
+    except HTTPException:
+        raise
+    except ImportError as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Missing required package: {str(e)}. Install with: pip install scikit-learn sentence-transformers"
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/attribute")
+async def attribute(req: AttributionRequest, background_tasks: BackgroundTasks):
+    """
+    Predict which model generated a response with the latest saved probe.
+
+    New responses are folded into the probe in the background as they are
+    saved, so it never trains or refits here. A catch-up sync is also queued
+    after the prediction, in case responses arrived some other way.
+    """
+    state = get_attribution_state()
+    if state is None:
+        raise HTTPException(status_code=400, detail="Attribution probe not trained. POST /attribute/train first")
+
+    try:
+        # The query is not a stored response, so keep it out of the embedding store
+        embeddings, _ = featurize([req.text], state["features"], state["embedding_model"], cache=False)
+        probabilities = attribution.predict(state, embeddings[0], req.prompt_id)
+        predicted_model = max(probabilities, key=probabilities.get)
+        background_tasks.add_task(sync_attribution_state)
+
+        return {
+            "predicted_model": predicted_model,
+            "provider": MODELS.get(predicted_model, "unknown"),
+            "probabilities": probabilities,
+            "embedding_model": state["embedding_model"],
+            "features": state["features"]
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/near-duplicates")
+async def find_near_duplicates(
+    threshold: float = Query(NEAR_DUPLICATE_THRESHOLD, gt=0, le=1),
+    models: Optional[List[str]] = Query(None),
+    categories: Optional[List[str]] = Query(None),
+    same_prompt: bool = True,
+    limit: int = Query(100, ge=0),
+):
+    """
+    Cross-model response pairs whose estimated Jaccard similarity over word
+    shingles is at least `threshold`, found with MinHash LSH rather than by
+    comparing every pair. Also aggregates flagged pairs per model pair.
+
+    With same_prompt=true (default) only answers to the same prompt are compared.
+    LSH bands are sized for the threshold, so a pair at the threshold is a
+    candidate with probability at least NEAR_DUPLICATE_RECALL.
+    """
+    rows_per_band = near_duplicates.rows_per_band_for(threshold)
+    if rows_per_band is None:
+        raise HTTPException(
+            status_code=400,
+            detail=f"threshold must be at least {near_duplicates.min_threshold():.3f} "
+                   f"with {MINHASH_PERMUTATIONS} MinHash permutations"
+        )
+
+    try:
+        responses = load_responses()
+        if models:
+            responses = [r for r in responses if r["model"] in models]
+        if categories:
+            prompt_categories = get_prompt_categories()
+            responses = [r for r in responses if prompt_categories.get(r.get("prompt_id")) in categories]
+
+        signatures = get_minhash_signatures([r["response"] for r in responses])
+        blocks = None
+        if same_prompt:
+            prompt_codes = {}
+            blocks = np.array([prompt_codes.setdefault(r.get("prompt_id"), len(prompt_codes)) for r in responses])
+
+        candidates = near_duplicates.candidate_pairs(signatures, rows_per_band, blocks)
+
+        pairs = []
+        for i, j in candidates:
+            if responses[i]["model"] == responses[j]["model"]:
+                continue
+            jaccard = near_duplicates.estimated_jaccard(signatures, i, j)
+            if jaccard >= threshold:
+                pairs.append((jaccard, i, j))
+        pairs.sort(reverse=True)
+
+        # How many cross-model pairs could have been flagged, per model pair
+        model_totals = Counter(r["model"] for r in responses)
+        comparable = Counter()
+        if same_prompt:
+            per_prompt = defaultdict(Counter)
+            for r in responses:
+                per_prompt[r.get("prompt_id")][r["model"]] += 1
+            for counts in per_prompt.values():
+                for model_a, model_b in combinations(sorted(counts), 2):
+                    comparable[(model_a, model_b)] += counts[model_a] * counts[model_b]
+        else:
+            for model_a, model_b in combinations(sorted(model_totals), 2):
+                comparable[(model_a, model_b)] = model_totals[model_a] * model_totals[model_b]
+
+        flagged = defaultdict(list)
+        for jaccard, i, j in pairs:
+            flagged[tuple(sorted((responses[i]["model"], responses[j]["model"])))].append(jaccard)
+
+        model_pairs = sorted(
+            (
+                {
+                    "models": list(model_pair),
+                    "flagged": len(flagged[model_pair]),
+                    "comparable": comparable[model_pair],
+                    "rate": len(flagged[model_pair]) / comparable[model_pair],
+                    "mean_jaccard": float(np.mean(flagged[model_pair])) if flagged[model_pair] else None,
+                }
+                for model_pair in comparable
+                if comparable[model_pair]
+            ),
+            key=lambda p: p["rate"],
+            reverse=True
+        )
+
+        def describe(r: Dict) -> Dict:
+            return {
+                "prompt_id": r.get("prompt_id"),
+                "model": r["model"],
+                "response_preview": r["response"][:200] + "..." if len(r["response"]) > 200 else r["response"]
+            }
+
+        return {
+            "threshold": threshold,
+            "same_prompt": same_prompt,
+            "lsh": {
+                "rows_per_band": rows_per_band,
+                "bands": MINHASH_PERMUTATIONS // rows_per_band,
+                "recall_at_threshold": near_duplicates.candidate_probability(threshold, rows_per_band)
+            },
+            "total_responses": len(responses),
+            "candidates": len(candidates),
+            "total_pairs": len(pairs),
+            "pairs": [
+                {"jaccard": jaccard, "a": describe(responses[i]), "b": describe(responses[j])}
+                for jaccard, i, j in pairs[:limit]
+            ],
+            "model_pairs": model_pairs
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/export")
+async def export_snapshots(fmt: str = Query("parquet", alias="format"), embedding_model: Optional[str] = None):
+    """
+    Write columnar snapshots of responses and of one embedding model's vectors
+    to data/exports/. Snapshots whose source data is unchanged are reused.
+    """
+    if fmt not in export.FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unknown format '{fmt}'. Choose from: {list(export.FORMATS)}")
+    embedding_model = resolve_embedding_model(embedding_model, allow_cached=True)
+
+    try:
+        responses_snapshot = export.refresh_snapshot(
+            EXPORTS_DIR,
+            "responses",
+            fmt,
+            # Categories come from prompts.json, so it is part of the source too
+            [storage.file_signature(RESPONSES_FILE), storage.file_signature(PROMPTS_FILE)],
+            lambda: export.responses_table(
+                load_responses(),
+                get_prompt_categories().get,
+                lambda model: MODELS.get(model, "unknown"),
+                get_response_hash,
+            ),
+        )
+
+        store = storage.open_embedding_store(EMBEDDINGS_DIR, embedding_model)
+        embeddings_snapshot = None
+        if store is not None:
+            embeddings_snapshot = export.refresh_snapshot(
+                EXPORTS_DIR,
+                export.embeddings_snapshot_name(embedding_model),
+                fmt,
+                export.store_signature(store),
+                lambda: export.embeddings_table(store),
+            )
+        else:
+            # The store was purged (possibly by another worker); drop snapshots built from it
+            export.remove_snapshots(EXPORTS_DIR, export.embeddings_snapshot_name(embedding_model))
+
+        return {
+            "format": fmt,
+            "responses": responses_snapshot,
+            "embedding_model": embedding_model,
+            "embeddings": embeddings_snapshot
+        }
+
+    except ImportError as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Missing required package: {str(e)}. Install with: pip install pyarrow"
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/export/{filename}")
+async def download_snapshot(filename: str):
+    path = EXPORTS_DIR / filename
+    if path.parent != EXPORTS_DIR or path.suffix not in export.FORMATS.values() or not path.exists():
+        raise HTTPException(status_code=404, detail="Snapshot not found")
+    return FileResponse(path, filename=filename)
+
 @app.get("/embeddings/metadata")
 async def get_embedding_metadata():
     """
@@ -413,32 +1403,21 @@ async def get_embedding_metadata():
     """
     try:
         responses = load_responses()
-        prompts = load_prompts()
-
-        # Get unique models
-        models = list(set(r["model"] for r in responses))
-
-        # Get unique categories
-        categories = list(set(p["category"] for p in prompts))
-
-        # Count responses per model
-        model_counts = {}
-        for model in models:
-            model_counts[model] = sum(1 for r in responses if r["model"] == model)
-
-        # Count responses per category
-        prompt_categories = {p["id"]: p["category"] for p in prompts}
-        category_counts = {}
-        for category in categories:
-            category_counts[category] = sum(
-                1 for r in responses
-                if prompt_categories.get(r.get("prompt_id")) == category
-            )
+        registry = get_prompt_registry()
+
+        # Count responses per model and per category in a single pass
+        model_counts = Counter(r["model"] for r in responses)
+        prompt_categories = registry["category_by_id"]
+        response_categories = Counter(prompt_categories.get(r.get("prompt_id")) for r in responses)
+
+        models = list(model_counts.keys())
+        categories = list(registry["by_category"].keys())
+        category_counts = {category: response_categories.get(category, 0) for category in categories}
 
         return {
             "models": models,
             "categories": categories,
-            "model_counts": model_counts,
+            "model_counts": dict(model_counts),
             "category_counts": category_counts,
             "total_responses": len(responses)
         }
@@ -0,0 +1,131 @@
+"""
+Near-duplicate detection with MinHash and locality-sensitive hashing.
+
+Distillation often shows up as near-verbatim overlap between two models'
+answers, which sentence embeddings blur away. Each response gets a MinHash
+signature over its word shingles. LSH banding groups signatures that agree on
+a whole band, so candidate pairs come out in roughly linear time and only
+those candidates have their Jaccard similarity estimated.
+
+A pair with Jaccard similarity s shares at least one band of r rows (out of
+b = MINHASH_PERMUTATIONS / r bands) with probability 1 - (1 - s^r)^b. The
+band width is picked per threshold, so pairs at the threshold are not
+silently missed.
+"""
+
+import re
+import zlib
+from itertools import combinations
+from typing import List, Optional, Set, Tuple
+
+import numpy as np
+
+from settings import MINHASH_PERMUTATIONS, NEAR_DUPLICATE_RECALL, SHINGLE_SIZE
+
+MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+MAX_HASH = np.uint64(0xFFFFFFFF)
+TOKEN_RE = re.compile(r"\w+")
+CHUNK_SIZE = 1024
+
+# Fixed seed so signatures are comparable across workers and restarts
+_rng = np.random.default_rng(1)
+PERMUTATION_A = _rng.integers(1, 1 << 32, size=MINHASH_PERMUTATIONS, dtype=np.uint64)
+PERMUTATION_B = _rng.integers(0, 1 << 32, size=MINHASH_PERMUTATIONS, dtype=np.uint64)
+
+
+def shingle_hashes(text: str) -> np.ndarray:
+    """Distinct 32-bit hashes of the text's lowercased word SHINGLE_SIZE-grams."""
+    tokens = TOKEN_RE.findall(text.lower())
+    if not tokens:
+        return np.zeros(0, dtype=np.uint64)
+
+    token_hashes = np.array([zlib.crc32(t.encode("utf-8")) for t in tokens], dtype=np.uint64)
+    size = min(SHINGLE_SIZE, len(tokens))
+    count = len(tokens) - size + 1
+    hashes = np.zeros(count, dtype=np.uint64)
+    for offset in range(size):
+        # Polynomial rolling hash; uint64 arithmetic wraps, which is what we want
+        hashes = hashes * np.uint64(1000003) + token_hashes[offset:offset + count]
+    return np.unique(hashes & MAX_HASH)
+
+
+def minhash_signature(text: str) -> np.ndarray:
+    """
+    (MINHASH_PERMUTATIONS,) uint32 signature. The fraction of positions where
+    two signatures agree estimates the Jaccard similarity of their shingle sets.
+    Texts without words get an all-max signature, which never matches in LSH.
+    """
+    signature = np.full(MINHASH_PERMUTATIONS, MAX_HASH, dtype=np.uint64)
+    shingles = shingle_hashes(text)
+    for start in range(0, len(shingles), CHUNK_SIZE):
+        chunk = shingles[start:start + CHUNK_SIZE, np.newaxis]
+        permuted = ((chunk * PERMUTATION_A + PERMUTATION_B) % MERSENNE_PRIME) & MAX_HASH
+        signature = np.minimum(signature, permuted.min(axis=0))
+    return signature.astype(np.uint32)
+
+
+def minhash_signatures(texts: List[str]) -> np.ndarray:
+    return np.stack([minhash_signature(t) for t in texts]) if texts else np.zeros((0, MINHASH_PERMUTATIONS), dtype=np.uint32)
+
+
+def candidate_probability(similarity: float, rows_per_band: int) -> float:
+    """Probability that a pair with this Jaccard similarity shares at least one band."""
+    bands = MINHASH_PERMUTATIONS // rows_per_band
+    return 1 - (1 - similarity ** rows_per_band) ** bands
+
+
+def rows_per_band_for(threshold: float, recall: float = NEAR_DUPLICATE_RECALL) -> Optional[int]:
+    """
+    The widest bands (fewest spurious candidates) for which a pair exactly at
+    `threshold` is still a candidate with probability at least `recall`.
+    None if even single-row bands cannot reach it.
+    """
+    widths = [r for r in range(MINHASH_PERMUTATIONS, 0, -1) if MINHASH_PERMUTATIONS % r == 0]
+    for rows_per_band in widths:
+        if candidate_probability(threshold, rows_per_band) >= recall:
+            return rows_per_band
+    return None
+
+
+def min_threshold(recall: float = NEAR_DUPLICATE_RECALL) -> float:
+    """Lowest threshold reachable at `recall`, i.e. with single-row bands."""
+    return 1 - (1 - recall) ** (1 / MINHASH_PERMUTATIONS)
+
+
+def candidate_pairs(
+    signatures: np.ndarray, rows_per_band: int, blocks: Optional[np.ndarray] = None
+) -> Set[Tuple[int, int]]:
+    """
+    Index pairs (i < j) whose signatures agree on at least one LSH band of
+    `rows_per_band` rows.
+
+    Rows with the same `blocks` value are the only ones compared, e.g. pass
+    prompt ids to restrict candidates to answers to the same prompt.
+    """
+    n = len(signatures)
+    if blocks is None:
+        blocks = np.zeros(n, dtype=np.uint32)
+    if MINHASH_PERMUTATIONS % rows_per_band != 0:
+        raise ValueError("rows_per_band must divide MINHASH_PERMUTATIONS")
+    usable = ~(signatures == np.uint32(MAX_HASH)).all(axis=1)
+
+    pairs = set()
+    for band in range(MINHASH_PERMUTATIONS // rows_per_band):
+        band_keys = np.column_stack([
+            blocks.astype(np.uint32),
+            signatures[:, band * rows_per_band:(band + 1) * rows_per_band],
+        ])
+        # View each row as one opaque value so numpy can group identical rows quickly
+        band_keys = np.ascontiguousarray(band_keys).view(f"V{band_keys.shape[1] * 4}").ravel()
+        order = np.argsort(band_keys, kind="stable")
+        sorted_keys = band_keys[order]
+        boundaries = np.flatnonzero(sorted_keys[1:] != sorted_keys[:-1]) + 1
+        for bucket in np.split(order, boundaries):
+            bucket = bucket[usable[bucket]]
+            if len(bucket) > 1:
+                pairs.update(combinations(sorted(bucket.tolist()), 2))
+    return pairs
+
+
+def estimated_jaccard(signatures: np.ndarray, i: int, j: int) -> float:
+    return float(np.mean(signatures[i] == signatures[j]))
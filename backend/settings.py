@@ -16,10 +16,53 @@ MODELS = {
     "deepseek/deepseek-v3.2-exp": "deepseek",
 }
 
+# Stream completions from OpenRouter even for batch generation.
+# Streaming lets us record time-to-first-token alongside total latency.
+STREAM_UPSTREAM = True
+
+# Background batch jobs refresh a heartbeat every JOB_HEARTBEAT_SECONDS while they
+# run; a running job whose heartbeat is older than JOB_STALE_SECONDS is reported as
+# failed, since the worker that owned it has died.
+JOB_HEARTBEAT_SECONDS = 5
+JOB_STALE_SECONDS = 60
+
 # Embedding model for semantic similarity analysis
 # This should be a valid sentence-transformers model
 EMBEDDING_MODEL = "all-mpnet-base-v2"
 
+# Embedding models clients may request. Anything else is rejected rather than
+# downloaded, and these names are also used as cache directory names.
+EMBEDDING_MODELS = [
+    "all-mpnet-base-v2",
+    "all-MiniLM-L6-v2",
+    "multi-qa-mpnet-base-dot-v1",
+]
+
+# How many embedding models to keep loaded in memory at once.
+# Requests for other models load them on demand, evicting the least recently used.
+MAX_RESIDENT_EMBEDDERS = 2
+
+# Feature sets that can stand in for embeddings in similarity views:
+# "embedding" runs EMBEDDING_MODEL, "fingerprint" uses cheap stylometric features
+FEATURE_SETS = ["embedding", "fingerprint"]
+
+# Width of the random projection applied to hashed n-gram fingerprints
+FINGERPRINT_DIMS = 256
+
+# Near-duplicate detection: MinHash signature length, word shingle size, and the
+# default Jaccard similarity above which a cross-model pair is reported.
+# LSH bands are chosen per query so that a pair exactly at the threshold becomes
+# a candidate with probability at least NEAR_DUPLICATE_RECALL.
+MINHASH_PERMUTATIONS = 128
+SHINGLE_SIZE = 5
+NEAR_DUPLICATE_THRESHOLD = 0.5
+NEAR_DUPLICATE_RECALL = 0.95
+
+# Model attribution probe: prompt-grouped cross-validation folds and
+# shuffled passes over the corpus when training from scratch
+ATTRIBUTION_CV_FOLDS = 5
+ATTRIBUTION_FIT_EPOCHS = 20
+
 
 # Validation
 def validate_models():
@@ -42,6 +85,33 @@ def validate_models():
     if not isinstance(EMBEDDING_MODEL, str):
         raise ValueError("EMBEDDING_MODEL must be a string")
 
+    if EMBEDDING_MODEL not in EMBEDDING_MODELS:
+        raise ValueError("EMBEDDING_MODEL must be listed in EMBEDDING_MODELS")
+
+    if not 0 < JOB_HEARTBEAT_SECONDS < JOB_STALE_SECONDS:
+        raise ValueError("JOB_HEARTBEAT_SECONDS must be positive and below JOB_STALE_SECONDS")
+
+    if not isinstance(MAX_RESIDENT_EMBEDDERS, int) or MAX_RESIDENT_EMBEDDERS < 1:
+        raise ValueError("MAX_RESIDENT_EMBEDDERS must be a positive integer")
+
+    if not isinstance(FINGERPRINT_DIMS, int) or FINGERPRINT_DIMS < 1:
+        raise ValueError("FINGERPRINT_DIMS must be a positive integer")
+
+    if not isinstance(MINHASH_PERMUTATIONS, int) or MINHASH_PERMUTATIONS < 1:
+        raise ValueError("MINHASH_PERMUTATIONS must be a positive integer")
+
+    if not 0 < NEAR_DUPLICATE_THRESHOLD <= 1:
+        raise ValueError("NEAR_DUPLICATE_THRESHOLD must be in (0, 1]")
+
+    if not 0 < NEAR_DUPLICATE_RECALL < 1:
+        raise ValueError("NEAR_DUPLICATE_RECALL must be in (0, 1)")
+
+    if ATTRIBUTION_CV_FOLDS < 2:
+        raise ValueError("ATTRIBUTION_CV_FOLDS must be at least 2")
+
+    if ATTRIBUTION_FIT_EPOCHS < 1:
+        raise ValueError("ATTRIBUTION_FIT_EPOCHS must be at least 1")
+
 
 # Run validation on import
 validate_models()
@@ -0,0 +1,233 @@
+"""
+Process-safe storage for the data directory.
+
+Several uvicorn workers can share data/. Writers take an exclusive flock on a
+sidecar lock file and replace files atomically, so a reader never sees a
+half-written file. Readers cache parsed contents keyed by the file's
+(inode, mtime, size) signature, so a write by any worker invalidates every
+worker's copy on its next read. The in-process caches are also shared by
+request handlers and background threads, so each is guarded by a thread lock.
+
+Embedding vectors are stored per embedding model as an append-only float32
+matrix plus a newline-separated list of text hashes. The same layout holds
+other fixed-width per-text vectors, such as uint32 MinHash signatures. Workers memory-map the
+matrix read-only, so the OS page cache holds a single copy shared by all of
+them, and only the newly appended hashes are read when the store grows.
+"""
+
+import fcntl
+import json
+import os
+import shutil
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+VECTORS_FILE = "vectors.f32"
+HASHES_FILE = "hashes.txt"
+META_FILE = "meta.json"
+
+
+@contextmanager
+def locked(path: Path):
+    """Hold an exclusive cross-process lock associated with `path`."""
+    lock_path = path.with_name(path.name + ".lock")
+    with open(lock_path, "a") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def _signature(stat: os.stat_result) -> tuple:
+    return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+
+def file_signature(path: Path) -> Optional[tuple]:
+    """(inode, mtime, size) of a file, or None if it does not exist."""
+    try:
+        return _signature(path.stat())
+    except FileNotFoundError:
+        return None
+
+
+def atomic_write_bytes(path: Path, data: bytes):
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def atomic_write_json(path: Path, obj: Any):
+    atomic_write_bytes(path, json.dumps(obj, indent=2).encode("utf-8"))
+
+
+# Parsed JSON files, keyed by path: (signature, data)
+_json_cache: Dict[Path, tuple] = {}
+_json_cache_lock = threading.Lock()
+
+
+def read_json(path: Path, default: Any = None) -> Any:
+    """
+    Read a JSON file, re-parsing only when it has changed on disk.
+    The returned object is shared between callers and must not be mutated.
+    """
+    signature = file_signature(path)
+    if signature is None:
+        return default
+
+    with _json_cache_lock:
+        cached = _json_cache.get(path)
+    if cached and cached[0] == signature:
+        return cached[1]
+
+    # Parse outside the lock so one large file does not block reads of others
+    try:
+        with open(path, "r") as f:
+            # Sign the file we actually parsed, in case it was replaced since the stat
+            signature = _signature(os.fstat(f.fileno()))
+            data = json.load(f)
+    except FileNotFoundError:
+        return default
+
+    with _json_cache_lock:
+        cached = _json_cache.get(path)
+        # Another thread may have parsed the same version meanwhile; keep a single
+        # copy so callers that compare by identity agree
+        if cached and cached[0] == signature:
+            return cached[1]
+        _json_cache[path] = (signature, data)
+    return data
+
+
+def model_dir(root: Path, embedding_model: str) -> Path:
+    name = embedding_model.replace("/", "__")
+    # Never resolve to root itself or its parent; purging would delete them
+    if name in ("", ".", ".."):
+        raise ValueError(f"Invalid store name '{embedding_model}'")
+    return root / name
+
+
+def vectors_path(directory: Path, dtype: str) -> Path:
+    return directory / (VECTORS_FILE if dtype == "float32" else f"vectors.{dtype}")
+
+
+# Per-worker view of each store, keyed by its directory so stores under
+# different roots (e.g. embeddings and MinHash signatures) never collide.
+# A published store dict is never modified: catching up builds a new one, so a
+# caller can keep using the store it got while another thread catches up.
+_embedding_stores: Dict[Path, Dict] = {}
+_embedding_stores_lock = threading.Lock()
+
+
+def open_embedding_store(root: Path, embedding_model: str) -> Optional[Dict]:
+    """
+    Return {"index": {hash: row}, "vectors": read-only memmap} for an embedding model,
+    catching up with rows appended by any worker since the last call.
+    """
+    directory = model_dir(root, embedding_model)
+    hashes_path = directory / HASHES_FILE
+
+    # Held across the catch-up so two threads never consume the same appended rows
+    with _embedding_stores_lock:
+        signature = file_signature(hashes_path)
+        if signature is None:
+            _embedding_stores.pop(directory, None)
+            return None
+
+        store = _embedding_stores.get(directory)
+        if store is None or store["inode"] != signature[0] or signature[2] < store["offset"]:
+            meta = read_json(directory / META_FILE)
+            store = {
+                "inode": signature[0], "offset": 0, "index": {}, "rows": 0, "vectors": None,
+                "dim": meta["dim"], "dtype": meta.get("dtype", "float32"),
+            }
+
+        if signature[2] > store["offset"]:
+            with open(hashes_path, "rb") as f:
+                f.seek(store["offset"])
+                data = f.read()
+            # Only consume complete lines; a writer may be mid-append
+            end = data.rfind(b"\n") + 1
+            if end:
+                index = dict(store["index"])
+                rows = store["rows"]
+                for text_hash in data[:end].decode("ascii").splitlines():
+                    index[text_hash] = rows
+                    rows += 1
+                store = {**store, "index": index, "rows": rows, "offset": store["offset"] + end}
+
+        if store["rows"] and (store["vectors"] is None or len(store["vectors"]) != store["rows"]):
+            store = {**store, "vectors": np.memmap(
+                vectors_path(directory, store["dtype"]), dtype=store["dtype"], mode="r", shape=(store["rows"], store["dim"])
+            )}
+
+        _embedding_stores[directory] = store
+        return store
+
+
+def append_embeddings(root: Path, embedding_model: str, hashes: List[str], vectors: np.ndarray, dtype: str = "float32"):
+    """Append vectors for hashes the store does not have yet."""
+    directory = model_dir(root, embedding_model)
+    vectors = np.asarray(vectors, dtype=dtype)
+
+    # The lock file sits beside the model directory, so purging it never deletes a held lock
+    with locked(directory):
+        directory.mkdir(parents=True, exist_ok=True)
+        meta_path = directory / META_FILE
+        if not meta_path.exists():
+            atomic_write_json(meta_path, {"embedding_model": embedding_model, "dim": int(vectors.shape[1]), "dtype": dtype})
+
+        store = open_embedding_store(root, embedding_model)
+        known = store["index"] if store else {}
+        rows = store["rows"] if store else 0
+        dim = store["dim"] if store else vectors.shape[1]
+        if vectors.shape[1] != dim:
+            raise ValueError(f"Embedding width {vectors.shape[1]} does not match stored width {dim}")
+
+        new_hashes, new_rows, seen = [], [], set()
+        for text_hash, vector in zip(hashes, vectors):
+            if text_hash not in known and text_hash not in seen:
+                seen.add(text_hash)
+                new_hashes.append(text_hash)
+                new_rows.append(vector)
+        if not new_hashes:
+            return
+
+        # Vectors go first and hashes last, so every indexed row is fully written.
+        # Truncating drops rows left behind by a writer that died between the two.
+        with open(vectors_path(directory, dtype), "ab") as f:
+            f.truncate(rows * dim * vectors.itemsize)
+            f.write(np.stack(new_rows).tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+        with open(directory / HASHES_FILE, "a") as f:
+            f.write("\n".join(new_hashes) + "\n")
+
+
+def purge_embeddings(root: Path, embedding_model: str) -> int:
+    """Delete an embedding model's store. Returns how many vectors it held."""
+    directory = model_dir(root, embedding_model)
+    with locked(directory):
+        store = open_embedding_store(root, embedding_model)
+        if store is None:
+            return 0
+        shutil.rmtree(directory)
+        with _embedding_stores_lock:
+            _embedding_stores.pop(directory, None)
+        return store["rows"]
+
+
+def list_embedding_models(root: Path) -> List[str]:
+    if not root.exists():
+        return []
+    return [
+        read_json(meta_path)["embedding_model"]
+        for meta_path in sorted(root.glob(f"*/{META_FILE}"))
+    ]
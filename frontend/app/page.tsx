@@ -1,6 +1,6 @@
 "use client";
 
-import { useState, useEffect } from "react";
+import { useState, useEffect, useCallback } from "react";
 import { Prompt, Response, View } from "@/lib/types";
 import { api } from "@/lib/api";
 import PracticeMode from "@/components/PracticeMode";
@@ -25,6 +25,8 @@ export default function Home() {
     Record<number, string[]>
   >({});
   const [generating, setGenerating] = useState<Record<number, boolean>>({});
+  // Set when the batch runner saves responses; they are reloaded once we leave it
+  const [responsesStale, setResponsesStale] = useState(false);
 
   useEffect(() => {
     loadConfig();
@@ -59,6 +61,15 @@ export default function Home() {
     }
   };
 
+  const markResponsesStale = useCallback(() => setResponsesStale(true), []);
+
+  useEffect(() => {
+    if (responsesStale && view !== "batch") {
+      setResponsesStale(false);
+      loadResponses();
+    }
+  }, [view, responsesStale]);
+
   const toggleModel = (promptId: number, model: string) => {
     setSelectedModels((prev) => {
       const current = prev[promptId] || [];
@@ -171,11 +182,10 @@ export default function Home() {
     return (
       <BatchRunner
         prompts={prompts}
-        responses={responses}
         models={models}
         currentView={view}
         onNavigate={setView}
-        onRefresh={loadResponses}
+        onResponsesChanged={markResponsesStale}
       />
     );
   }
@@ -1,7 +1,7 @@
 "use client";
 
-import { useState, useMemo, useEffect } from "react";
-import { Prompt, Response, View, BatchJobStatus } from "@/lib/types";
+import { useState, useMemo, useEffect, useCallback, useRef } from "react";
+import { Prompt, View, BatchJobStatus, Coverage, CoverageJob } from "@/lib/types";
 import { api } from "@/lib/api";
 import { AppSidebar } from "@/components/app-sidebar";
 import { SidebarInset, SidebarTrigger } from "@/components/ui/sidebar";
@@ -17,22 +17,23 @@ import {
 import { Card, CardContent } from "@/components/ui/card";
 import { Check, Loader2 } from "lucide-react";
 
+// How often to poll a running coverage job for progress
+const JOB_POLL_INTERVAL_MS = 2000;
+
 interface BatchRunnerProps {
   prompts: Prompt[];
-  responses: Response[];
   models: string[];
   currentView: View;
   onNavigate: (view: View) => void;
-  onRefresh: () => void;
+  onResponsesChanged: () => void;
 }
 
 export default function BatchRunner({
   prompts,
-  responses,
   models,
   currentView,
   onNavigate,
-  onRefresh,
+  onResponsesChanged,
 }: BatchRunnerProps) {
   // Phase: 'selection' or 'execution'
   const [phase, setPhase] = useState<"selection" | "execution">(() => {
@@ -60,14 +61,6 @@ export default function BatchRunner({
     return new Set();
   });
 
-  const [batchSize, setBatchSize] = useState<number>(() => {
-    if (typeof window !== 'undefined') {
-      const saved = sessionStorage.getItem('batchRunnerBatchSize');
-      return saved ? parseInt(saved) : 5;
-    }
-    return 5;
-  });
-
   // Execution state
   const [jobStatuses, setJobStatuses] = useState<BatchJobStatus[]>(() => {
     if (typeof window !== 'undefined') {
@@ -77,7 +70,96 @@ export default function BatchRunner({
     return [];
   });
 
-  const [isRunning, setIsRunning] = useState(false);
+  // Server-side coverage job generating the selected cells, if one is running
+  const [jobId, setJobId] = useState<string | null>(() => {
+    if (typeof window !== 'undefined') {
+      return sessionStorage.getItem('batchRunnerJobId');
+    }
+    return null;
+  });
+
+  const [isStarting, setIsStarting] = useState(false);
+  const isRunning = isStarting || jobId !== null;
+
+  // Filled prompt/model cells, as "promptId:model" keys, from the server's coverage index.
+  // null until the first load, so cells are not shown as empty before we know.
+  const [coveredCells, setCoveredCells] = useState<Set<string> | null>(null);
+
+  const loadCoverage = useCallback(async () => {
+    try {
+      const coverage: Coverage = await api.getCoverage(models);
+      const cells = new Set<string>();
+      coverage.prompt_ids.forEach((promptId, i) => {
+        coverage.models.forEach((model, j) => {
+          if (coverage.counts[i][j] > 0) cells.add(`${promptId}:${model}`);
+        });
+      });
+      setCoveredCells(cells);
+    } catch (error) {
+      console.error("Failed to load coverage", error);
+    }
+  }, [models]);
+
+  useEffect(() => {
+    loadCoverage();
+  }, [loadCoverage]);
+
+  // Poll the running job, mirroring its per-cell progress into the grid.
+  // Each poll only fetches the cell updates logged since the previous one.
+  const jobOffset = useRef(0);
+
+  useEffect(() => {
+    if (!jobId) return;
+
+    let cancelled = false;
+    let inFlight = false;
+    jobOffset.current = 0;
+    const poll = async () => {
+      // A slow response must not be applied after a newer one
+      if (inFlight) return;
+      inFlight = true;
+      try {
+        const job: CoverageJob = await api.getCoverageJob(jobId, jobOffset.current);
+        if (cancelled) return;
+        jobOffset.current = job.next_offset;
+
+        // Later updates for a cell supersede earlier ones
+        const cellStatuses = new Map(
+          job.updates.map((cell) => [`${cell.prompt_id}:${cell.model}`, cell] as const)
+        );
+        setJobStatuses((prev) =>
+          prev.map((status) => {
+            const cell = cellStatuses.get(`${status.promptId}:${status.model}`);
+            const next = cell ? { ...status, status: cell.status, error: cell.error } : status;
+            // The job died: cells it never finished will not be generated
+            if (job.status === "failed" && (next.status === "queued" || next.status === "running")) {
+              return { ...next, status: "failed", error: job.error };
+            }
+            return next;
+          })
+        );
+
+        if (job.status !== "running") {
+          setJobId(null);
+          await loadCoverage();
+          if (job.generated > 0) onResponsesChanged();
+        }
+      } catch (error) {
+        console.error("Failed to poll batch job", error);
+        // The job is gone (e.g. the data directory was reset); stop polling
+        setJobId(null);
+      } finally {
+        inFlight = false;
+      }
+    };
+
+    poll();
+    const interval = setInterval(poll, JOB_POLL_INTERVAL_MS);
+    return () => {
+      cancelled = true;
+      clearInterval(interval);
+    };
+  }, [jobId, loadCoverage, onResponsesChanged]);
 
   // Persist state to sessionStorage
   useEffect(() => {
@@ -100,9 +182,13 @@ export default function BatchRunner({
 
   useEffect(() => {
     if (typeof window !== 'undefined') {
-      sessionStorage.setItem('batchRunnerBatchSize', batchSize.toString());
+      if (jobId) {
+        sessionStorage.setItem('batchRunnerJobId', jobId);
+      } else {
+        sessionStorage.removeItem('batchRunnerJobId');
+      }
     }
-  }, [batchSize]);
+  }, [jobId]);
 
   useEffect(() => {
     if (typeof window !== 'undefined') {
@@ -180,23 +266,26 @@ export default function BatchRunner({
 
   // Check if response already exists
   const hasResponse = (promptId: number, model: string): boolean => {
-    return responses.some(
-      (r) => r.prompt_id === promptId && r.model === model
-    );
+    return coveredCells !== null && coveredCells.has(`${promptId}:${model}`);
   };
 
+  const coverageLoading = coveredCells === null;
+  const loadingCellColor = "bg-muted border-muted animate-pulse";
+
   // Get cell background color based on state
   const getCellColor = (promptId: number, model: string): string => {
     if (phase === "selection") {
       const isSelected =
         selectedPrompts.has(promptId) && selectedModels.has(model);
       if (isSelected) return "bg-blue-100 dark:bg-blue-900/30 border-blue-300";
+      if (coverageLoading) return loadingCellColor;
       if (hasResponse(promptId, model))
         return "bg-green-50 dark:bg-green-900/20 border-green-200";
       return "bg-gray-50 dark:bg-gray-800 border-gray-200";
     } else {
       const status = getJobStatus(promptId, model);
       if (!status) {
+        if (coverageLoading) return loadingCellColor;
         if (hasResponse(promptId, model))
           return "bg-green-100 dark:bg-green-900/30 border-green-300";
         return "bg-gray-50 dark:bg-gray-800 border-gray-200";
@@ -226,6 +315,8 @@ export default function BatchRunner({
           <p className="text-xs text-muted-foreground">
             {isSelected
               ? "Selected to run"
+              : coverageLoading
+              ? "Loading coverage..."
               : existing
               ? "Response exists"
               : "Click to select"}
@@ -258,7 +349,8 @@ export default function BatchRunner({
     }
   };
 
-  // Run batch generation
+  // Run batch generation: the server plans the missing cells and generates
+  // them in the background, so we only poll the job and refresh coverage
   const handleRunBatch = async () => {
     if (selectedPrompts.size === 0 || selectedModels.size === 0) return;
 
@@ -275,57 +367,41 @@ export default function BatchRunner({
     });
     setJobStatuses(jobs);
     setPhase("execution");
-    setIsRunning(true);
-
-    // Process in batches
-    const promptIds = Array.from(selectedPrompts);
-    const models = Array.from(selectedModels);
+    setIsStarting(true);
 
     try {
-      for (let i = 0; i < promptIds.length; i += batchSize) {
-        const batchPromptIds = promptIds.slice(i, i + batchSize);
-
-        // Update statuses to running for this batch
-        setJobStatuses((prev) =>
-          prev.map((job) =>
-            batchPromptIds.includes(job.promptId) && job.status === "queued"
-              ? { ...job, status: "running" }
-              : job
-          )
-        );
-
-        // Generate responses for this batch
-        try {
-          await api.generateBatchMultiple(batchPromptIds, models);
-
-          // Mark as completed
-          setJobStatuses((prev) =>
-            prev.map((job) =>
-              batchPromptIds.includes(job.promptId) && job.status === "running"
-                ? { ...job, status: "completed" }
-                : job
-            )
-          );
-        } catch (error) {
-          // Mark as failed
-          setJobStatuses((prev) =>
-            prev.map((job) =>
-              batchPromptIds.includes(job.promptId) && job.status === "running"
-                ? {
-                    ...job,
-                    status: "failed",
-                    error: error instanceof Error ? error.message : "Unknown error",
-                  }
-                : job
-            )
-          );
-        }
+      const plan = await api.planCoverage(
+        Array.from(selectedModels),
+        undefined,
+        1,
+        true,
+        Array.from(selectedPrompts)
+      );
 
-        // Refresh responses after each batch
-        await onRefresh();
-      }
+      // Cells missing from the plan already have a response
+      const planned = new Set(
+        plan.cells.map(
+          (cell: { prompt_id: number; model: string }) => `${cell.prompt_id}:${cell.model}`
+        )
+      );
+      setJobStatuses((prev) =>
+        prev.map((job) =>
+          planned.has(`${job.promptId}:${job.model}`)
+            ? job
+            : { ...job, status: "completed" }
+        )
+      );
+      setJobId(plan.job_id);
+    } catch (error) {
+      setJobStatuses((prev) =>
+        prev.map((job) => ({
+          ...job,
+          status: "failed",
+          error: error instanceof Error ? error.message : "Unknown error",
+        }))
+      );
     } finally {
-      setIsRunning(false);
+      setIsStarting(false);
     }
   };
 
@@ -333,6 +409,7 @@ export default function BatchRunner({
   const handleReset = () => {
     setPhase("selection");
     setJobStatuses([]);
+    setJobId(null);
     setSelectedPrompts(new Set());
     setSelectedModels(new Set());
 
@@ -342,6 +419,7 @@ export default function BatchRunner({
       sessionStorage.removeItem('batchRunnerJobStatuses');
       sessionStorage.removeItem('batchRunnerSelectedPrompts');
       sessionStorage.removeItem('batchRunnerSelectedModels');
+      sessionStorage.removeItem('batchRunnerJobId');
     }
   };
 
@@ -402,28 +480,6 @@ export default function BatchRunner({
                 </CardContent>
               </Card>
 
-              {/* Batch Size Selection */}
-              <Card>
-                <CardContent className="pt-6">
-                  <h3 className="text-sm font-medium mb-3">Batch Size</h3>
-                  <div className="flex gap-2">
-                    {[3, 5, 10].map((size) => (
-                      <Button
-                        key={size}
-                        variant={batchSize === size ? "default" : "outline"}
-                        size="sm"
-                        onClick={() => setBatchSize(size)}
-                      >
-                        {size}
-                      </Button>
-                    ))}
-                  </div>
-                  <p className="text-xs text-muted-foreground mt-2">
-                    Process {batchSize} prompts at a time
-                  </p>
-                </CardContent>
-              </Card>
-
               {/* Run Button */}
               <div className="flex gap-2 items-center">
                 <Button
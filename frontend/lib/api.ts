@@ -17,6 +17,20 @@ export const api = {
     return res.json();
   },
 
+  async importPrompts(jsonl: string, category?: string) {
+    const query = category ? `?category=${encodeURIComponent(category)}` : "";
+    const res = await fetch(`${API_BASE_URL}/prompts/import${query}`, {
+      method: "POST",
+      headers: { "Content-Type": "application/x-ndjson" },
+      body: jsonl,
+    });
+    if (!res.ok) {
+      const error = await res.json();
+      throw new Error(error.detail || "Failed to import prompts");
+    }
+    return res.json();
+  },
+
   async getResponses() {
     const res = await fetch(`${API_BASE_URL}/responses`, {
       cache: 'no-store',
@@ -46,6 +60,14 @@ export const api = {
     return res.json();
   },
 
+  async getTelemetry() {
+    const res = await fetch(`${API_BASE_URL}/telemetry`, {
+      cache: 'no-store',
+    });
+    if (!res.ok) throw new Error("Failed to load telemetry");
+    return res.json();
+  },
+
   async generateBatchMultiple(promptIds: number[], models: string[]) {
     const res = await fetch(`${API_BASE_URL}/generate-batch-multiple`, {
       method: "POST",
@@ -56,6 +78,78 @@ export const api = {
     return res.json();
   },
 
+  async getCoverage(models?: string[], categories?: string[]) {
+    const params = new URLSearchParams();
+    models?.forEach((model) => params.append("models", model));
+    categories?.forEach((category) => params.append("categories", category));
+    const res = await fetch(`${API_BASE_URL}/coverage?${params}`, {
+      cache: 'no-store',
+    });
+    if (!res.ok) throw new Error("Failed to load coverage");
+    return res.json();
+  },
+
+  async planCoverage(
+    models: string[],
+    categories?: string[],
+    samplesPerCell: number = 1,
+    enqueue: boolean = false,
+    promptIds?: number[]
+  ) {
+    const res = await fetch(`${API_BASE_URL}/coverage/plan`, {
+      method: "POST",
+      headers: { "Content-Type": "application/json" },
+      body: JSON.stringify({
+        models,
+        categories: categories || null,
+        prompt_ids: promptIds || null,
+        samples_per_cell: samplesPerCell,
+        enqueue,
+      }),
+    });
+    if (!res.ok) throw new Error("Failed to plan batch");
+    return res.json();
+  },
+
+  async getCoverageJob(jobId: string, since: number = 0) {
+    const res = await fetch(`${API_BASE_URL}/coverage/jobs/${jobId}?since=${since}`, {
+      cache: 'no-store',
+    });
+    if (!res.ok) throw new Error("Failed to load batch job");
+    return res.json();
+  },
+
+  async findNearDuplicates(
+    threshold?: number,
+    models?: string[],
+    samePrompt: boolean = true
+  ) {
+    const params = new URLSearchParams({ same_prompt: String(samePrompt) });
+    if (threshold !== undefined) params.append("threshold", String(threshold));
+    models?.forEach((model) => params.append("models", model));
+    const res = await fetch(`${API_BASE_URL}/near-duplicates?${params}`, {
+      cache: 'no-store',
+    });
+    if (!res.ok) {
+      const error = await res.json();
+      throw new Error(error.detail || "Failed to find near-duplicates");
+    }
+    return res.json();
+  },
+
+  async exportSnapshots(format: "parquet" | "arrow" = "parquet", embeddingModel?: string) {
+    const params = new URLSearchParams({ format });
+    if (embeddingModel) params.append("embedding_model", embeddingModel);
+    const res = await fetch(`${API_BASE_URL}/export?${params}`, {
+      method: "POST",
+    });
+    if (!res.ok) {
+      const error = await res.json();
+      throw new Error(error.detail || "Failed to export snapshots");
+    }
+    return res.json();
+  },
+
   async getEmbeddingMetadata() {
     const res = await fetch(`${API_BASE_URL}/embeddings/metadata`, {
       cache: 'no-store',
@@ -67,7 +161,9 @@ export const api = {
   async visualizeEmbeddings(
     models?: string[],
     categories?: string[],
-    centerByPrompt: boolean = true
+    centerByPrompt: boolean = true,
+    embeddingModel?: string,
+    features: "embedding" | "fingerprint" = "embedding"
   ) {
     const res = await fetch(`${API_BASE_URL}/embeddings/visualize`, {
       method: "POST",
@@ -76,6 +172,8 @@ export const api = {
         models: models || null,
         categories: categories || null,
         center_by_prompt: centerByPrompt,
+        embedding_model: embeddingModel || null,
+        features,
       }),
     });
     if (!res.ok) {
@@ -84,4 +182,44 @@ export const api = {
     }
     return res.json();
   },
+
+  async purgeEmbeddingCache(embeddingModel: string) {
+    const res = await fetch(
+      `${API_BASE_URL}/embeddings/cache/${embeddingModel}`,
+      {
+        method: "DELETE",
+      }
+    );
+    if (!res.ok) throw new Error("Failed to purge embedding cache");
+    return res.json();
+  },
+
+  async trainAttribution(
+    embeddingModel?: string,
+    features: "embedding" | "fingerprint" = "embedding"
+  ) {
+    const res = await fetch(`${API_BASE_URL}/attribute/train`, {
+      method: "POST",
+      headers: { "Content-Type": "application/json" },
+      body: JSON.stringify({ embedding_model: embeddingModel || null, features }),
+    });
+    if (!res.ok) {
+      const error = await res.json();
+      throw new Error(error.detail || "Failed to train attribution probe");
+    }
+    return res.json();
+  },
+
+  async attribute(text: string, promptId?: number) {
+    const res = await fetch(`${API_BASE_URL}/attribute`, {
+      method: "POST",
+      headers: { "Content-Type": "application/json" },
+      body: JSON.stringify({ text, prompt_id: promptId ?? null }),
+    });
+    if (!res.ok) {
+      const error = await res.json();
+      throw new Error(error.detail || "Failed to attribute response");
+    }
+    return res.json();
+  },
 };
@@ -9,6 +9,10 @@ export interface Response {
   prompt: string;
   model: string;
   response: string;
+  ttft_ms?: number | null;
+  latency_ms?: number;
+  prompt_tokens?: number | null;
+  completion_tokens?: number | null;
 }
 
 export type View = "generate" | "review" | "practice" | "batch" | "visualize" | "design";
@@ -38,3 +42,33 @@ export interface EmbeddingMetadata {
   category_counts: Record<string, number>;
   total_responses: number;
 }
+
+export interface Coverage {
+  prompt_ids: number[];
+  models: string[];
+  counts: number[][];
+  complete_prompts: number;
+  filled_cells: number;
+  total_cells: number;
+}
+
+export interface CoverageJobCell {
+  prompt_id: number;
+  model: string;
+  status: "queued" | "running" | "completed" | "failed";
+  error?: string;
+}
+
+export interface CoverageJob {
+  job_id: string;
+  // "failed" when the job crashed or its worker stopped sending heartbeats
+  status: "running" | "completed" | "failed";
+  error?: string;
+  total_cells: number;
+  completed_cells: number;
+  failed_cells: number;
+  generated: number;
+  // Cell status changes logged since the requested offset, oldest first
+  updates: CoverageJobCell[];
+  next_offset: number;
+}